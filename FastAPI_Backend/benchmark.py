@@ -0,0 +1,251 @@
+"""
+Benchmarks for the recommendation engine on a synthetic dataset.
+
+Usage (from FastAPI_Backend):
+    python benchmark.py memory [--rows 520000]
+    python benchmark.py coldstart [--rows 520000]
+    python benchmark.py ann [--rows 1000000] [--k 10] [--nprobe 1 4 16 64]
+    python benchmark.py precision [--rows 1000000] [--k 10]
+    python benchmark.py shards [--rows 2000000] [--k 300] [--shards 1 2 4]
+    python benchmark.py serialize [--rows 100000] [--k 5 50 300]
+"""
+
+import argparse
+import os
+from concurrent.futures import ThreadPoolExecutor
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from recommendation_engine import NUTRITION_COLUMNS, PRECISIONS, IVFIndex, RecipeStore, build_artifact, load_recipe_store
+from model import build_engine, encode_recipes, recommend, output_recommended_recipes
+from schemas import PredictionOut, Recipe
+
+
+INGREDIENT_WORDS = [
+    'chicken', 'beef', 'pork', 'salt', 'pepper', 'garlic', 'onion', 'tomato',
+    'rice', 'pasta', 'cheese', 'milk', 'egg', 'butter', 'flour', 'sugar',
+    'olive oil', 'lemon', 'basil', 'cumin', 'tortilla', 'soy sauce', 'ginger',
+    'salmon', 'shrimp', 'potato', 'carrot', 'spinach', 'broccoli', 'yogurt',
+]
+CUISINES = ['American', 'Italian', 'Mexican', 'Asian', 'Indian', 'Other']
+
+
+def _r_lists(rng, n_rows, max_items):
+    """R-style ``c("...")`` strings, as stored in the Food.com dump."""
+    words = np.asarray(INGREDIENT_WORDS)
+    return [
+        'c(' + ', '.join(f'"{w}"' for w in rng.choice(words, rng.integers(2, max_items))) + ')'
+        for _ in range(n_rows)
+    ]
+
+
+def synthetic_dataset(n_rows, seed=0):
+    """A dataset with the column layout of ``dataset_enhanced.csv``."""
+    rng = np.random.default_rng(seed)
+    dataframe = pd.DataFrame({
+        'RecipeId': np.arange(n_rows),
+        'Name': [f'Recipe {i}' for i in range(n_rows)],
+        'CookTime': rng.integers(0, 120, n_rows).astype(str),
+        'PrepTime': rng.integers(0, 60, n_rows).astype(str),
+        'TotalTime': rng.integers(0, 180, n_rows).astype(str),
+        'RecipeIngredientParts': _r_lists(rng, n_rows, 12),
+    })
+    for column in NUTRITION_COLUMNS:
+        dataframe[column] = rng.gamma(2.0, 50.0, n_rows).round(1)
+    dataframe['RecipeInstructions'] = _r_lists(rng, n_rows, 6)
+    dataframe['Cuisine'] = rng.choice(CUISINES, n_rows)
+    return dataframe
+
+
+def random_targets(n_targets, seed=1):
+    return np.random.default_rng(seed).gamma(2.0, 50.0, (n_targets, len(NUTRITION_COLUMNS)))
+
+
+def bench_memory(args):
+    """Peak memory allocated while serving one request, per query shape."""
+    dataframe = synthetic_dataset(args.rows)
+    engine = build_engine(RecipeStore.from_dataframe(dataframe))
+    target = random_targets(1)[0]
+    print(f'{args.rows} rows, dataset {dataframe.memory_usage(deep=True).sum() / 2**20:.0f} MiB')
+
+    cases = [
+        ('unfiltered', []),
+        ('ingredients', ['chicken']),
+        ('ingredients (AND/NOT)', ['salt', 'pepper', '-pork']),
+    ]
+    for label, ingredients in cases:
+        for k in (5, 300):
+            tracemalloc.start()
+            start = time.perf_counter()
+            output_recommended_recipes(recommend(engine, target, ingredients, {'n_neighbors': k}))
+            elapsed = time.perf_counter() - start
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            print(f'{label:24s} k={k:<4d} peak {peak / 2**20:7.2f} MiB  {elapsed * 1000:7.1f} ms')
+
+
+def bench_coldstart(args):
+    """Time to a ready engine from the gzipped CSV vs the columnar artifact."""
+    with tempfile.TemporaryDirectory() as directory:
+        csv_path = os.path.join(directory, 'dataset_enhanced.csv')
+        synthetic_dataset(args.rows).to_csv(csv_path, index=False, compression='gzip')
+
+        start = time.perf_counter()
+        build_engine(load_recipe_store(csv_path))
+        print(f'csv       {time.perf_counter() - start:6.2f} s')
+
+        start = time.perf_counter()
+        build_artifact(csv_path)
+        print(f'build     {time.perf_counter() - start:6.2f} s (one-time)')
+
+        start = time.perf_counter()
+        build_engine(load_recipe_store(csv_path))
+        print(f'artifact  {time.perf_counter() - start:6.2f} s')
+
+
+def bench_ann(args):
+    """Recall@k and latency of IVF search vs exact search."""
+    store = RecipeStore.from_dataframe(synthetic_dataset(args.rows))
+    start = time.perf_counter()
+    store.ivf_index = IVFIndex.build(store.features)
+    print(f'{args.rows} rows, {len(store.ivf_index)} lists, index built in {time.perf_counter() - start:.1f} s')
+    engine = build_engine(store)
+    targets = random_targets(args.queries)
+
+    def run(params):
+        start = time.perf_counter()
+        results = [engine.recommend(target, [], params) for target in targets]
+        return results, (time.perf_counter() - start) / len(targets)
+
+    exact, elapsed = run({'n_neighbors': args.k})
+    print(f'exact        recall@{args.k} 1.000  {elapsed * 1000:7.2f} ms/query')
+    for nprobe in args.nprobe:
+        approx, elapsed = run({'n_neighbors': args.k, 'nprobe': nprobe})
+        recall = np.mean([len(set(a.index) & set(b.index)) / args.k for a, b in zip(exact, approx)])
+        print(f'nprobe={nprobe:<5d} recall@{args.k} {recall:.3f}  {elapsed * 1000:7.2f} ms/query')
+
+
+def bench_precision(args):
+    """
+    Matrix size, latency and agreement with float64 for each precision.
+    The float64 engine rebuilds its matrix from the raw nutrition values,
+    so it is an exact reference rather than an upcast of float32.
+    """
+    store = RecipeStore.from_dataframe(synthetic_dataset(args.rows))
+    targets = random_targets(args.queries)
+    params = {'n_neighbors': args.k, 'return_distance': True}
+    reference = None
+    for precision in ('float64', *[p for p in PRECISIONS if p != 'float64']):
+        engine = build_engine(store, precision)
+        start = time.perf_counter()
+        results = [recommend(engine, target, [], params) for target in targets]
+        elapsed = (time.perf_counter() - start) / len(targets)
+        reference = reference or results
+        recall = np.mean([len(set(a.index) & set(b.index)) / args.k for a, b in zip(reference, results)])
+        error = max(np.abs(a['Similarity'].to_numpy() - b['Similarity'].to_numpy()).max()
+                    for a, b in zip(reference, results))
+        print(f'{precision:8s} {engine.features.nbytes / 2**20:7.1f} MiB  {elapsed * 1000:7.2f} ms/query  '
+              f'recall@{args.k} {recall:.3f}  max |dsim| {error:.1e}')
+
+
+def bench_shards(args):
+    """Latency and throughput of exhaustive search per shard count."""
+    # Strings for millions of rows are slow to generate and never touched
+    # by the search, so score a random unit-norm matrix directly.
+    rng = np.random.default_rng(0)
+    features = rng.standard_normal((args.rows, len(NUTRITION_COLUMNS))).astype(np.float32)
+    features /= np.linalg.norm(features, axis=1, keepdims=True)
+    queries = rng.standard_normal((args.queries, len(NUTRITION_COLUMNS))).astype(np.float32)
+    store = RecipeStore.from_dataframe(synthetic_dataset(1000))
+    print(f'{args.rows} rows, k={args.k}, {os.cpu_count()} cpus')
+    for n_shards in args.shards:
+        engine = build_engine(store, n_shards=n_shards)
+        start = time.perf_counter()
+        for query in queries:
+            engine._search(features, query[None], args.k)
+        latency = (time.perf_counter() - start) / len(queries)
+        with ThreadPoolExecutor(max_workers=args.clients) as clients:
+            start = time.perf_counter()
+            list(clients.map(lambda query: engine._search(features, query[None], args.k), queries))
+            throughput = len(queries) / (time.perf_counter() - start)
+        print(f'shards={n_shards:<3d} {latency * 1000:8.1f} ms/query  '
+              f'{throughput:7.1f} queries/s with {args.clients} clients')
+
+
+def bench_serialize(args):
+    """Response encoding time: pydantic response_model vs columnar encoder."""
+    engine = build_engine(RecipeStore.from_dataframe(synthetic_dataset(args.rows)))
+    targets = random_targets(args.queries)
+    schema = {name: field.type_ for name, field in Recipe.__fields__.items()}
+
+    def validated(dataframe):
+        # What FastAPI does for response_model=PredictionOut
+        output = PredictionOut(output=output_recommended_recipes(dataframe))
+        return JSONResponse(jsonable_encoder(output, exclude_unset=True)).body
+
+    def columnar(dataframe):
+        return b'{"output":' + encode_recipes(dataframe, schema) + b'}'
+
+    for k in args.k:
+        results = [recommend(engine, target, [], {'n_neighbors': k, 'return_distance': True}) for target in targets]
+        timings = []
+        for encode in (validated, columnar):
+            start = time.perf_counter()
+            bodies = [encode(dataframe) for dataframe in results]
+            timings.append((time.perf_counter() - start) / len(results))
+        print(f'k={k:<4d} pydantic {timings[0] * 1000:7.2f} ms  columnar {timings[1] * 1000:7.2f} ms  '
+              f'{timings[0] / timings[1]:5.1f}x  ({len(bodies[0]) / 1024:.0f} KiB)')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    memory = subparsers.add_parser('memory', help='peak memory per request')
+    memory.add_argument('--rows', type=int, default=520000)
+    memory.set_defaults(func=bench_memory)
+
+    coldstart = subparsers.add_parser('coldstart', help='engine load time, CSV vs artifact')
+    coldstart.add_argument('--rows', type=int, default=520000)
+    coldstart.set_defaults(func=bench_coldstart)
+
+    ann = subparsers.add_parser('ann', help='recall@k and latency of approximate search')
+    ann.add_argument('--rows', type=int, default=1000000)
+    ann.add_argument('--k', type=int, default=10)
+    ann.add_argument('--queries', type=int, default=100)
+    ann.add_argument('--nprobe', type=int, nargs='+', default=[1, 4, 16, 64])
+    ann.set_defaults(func=bench_ann)
+
+    precision = subparsers.add_parser('precision', help='memory, latency and ranking agreement per precision')
+    precision.add_argument('--rows', type=int, default=1000000)
+    precision.add_argument('--k', type=int, default=10)
+    precision.add_argument('--queries', type=int, default=100)
+    precision.set_defaults(func=bench_precision)
+
+    shards = subparsers.add_parser('shards', help='latency and throughput per shard count')
+    shards.add_argument('--rows', type=int, default=2000000)
+    shards.add_argument('--k', type=int, default=300)
+    shards.add_argument('--queries', type=int, default=20)
+    shards.add_argument('--clients', type=int, default=4)
+    shards.add_argument('--shards', type=int, nargs='+', default=sorted({1, 2, 4, os.cpu_count()}))
+    shards.set_defaults(func=bench_shards)
+
+    serialize = subparsers.add_parser('serialize', help='response encoding time, pydantic vs columnar')
+    serialize.add_argument('--rows', type=int, default=100000)
+    serialize.add_argument('--k', type=int, nargs='+', default=[5, 50, 300])
+    serialize.add_argument('--queries', type=int, default=50)
+    serialize.set_defaults(func=bench_serialize)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
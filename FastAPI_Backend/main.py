@@ -1,46 +1,119 @@
-from fastapi import FastAPI
-from pydantic import BaseModel,conlist
-from typing import List,Optional
-import pandas as pd
-from model import recommend,output_recommended_recipes
+import asyncio
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from fastapi import FastAPI,Header,HTTPException,Response
+from fastapi.middleware.gzip import GZipMiddleware
+from starlette.concurrency import run_in_threadpool
+from typing import Optional
+from model import ARROW_STREAM,build_engine,recommend_many,encode_arrow,encode_recipes,merge_arrow,pa,text_fields
+from recommendation_engine import DETAIL_COLUMNS,ResultCache,load_recipe_store
+from schemas import SUMMARY_FIELDS,BatchIn,BatchOut,PredictionIn,PredictionOut,Recipe,RecipeDetail,params
 
 
 # Use the enhanced dataset with cuisine information; this keeps the project
-# smaller by avoiding duplicate raw datasets.
-dataset = pd.read_csv('../Data/dataset_enhanced.csv', compression='gzip')
+# smaller by avoiding duplicate raw datasets. The columnar artifact built by
+# `python recommendation_engine.py build` is preferred when present.
+dataset = load_recipe_store('../Data/dataset_enhanced.csv')
+# RECOMMENDER_SHARDS splits exhaustive search over that many threads
+engine = build_engine(dataset,n_shards=int(os.environ.get('RECOMMENDER_SHARDS','1')))
+# Repeated and near-identical targets (within the granularity, per nutrient)
+# are answered from an LRU cache
+cache = ResultCache(int(os.environ.get('RECOMMENDER_CACHE_SIZE','1024')),
+                    float(os.environ.get('RECOMMENDER_CACHE_GRANULARITY','1')))
+
+# With RECOMMENDER_WORKERS > 0 requests are scored in that many forked worker
+# processes, which share the engine loaded above copy-on-write. At most
+# RECOMMENDER_QUEUE requests wait or run at once; beyond that /predict/
+# (and /predict/batch) answers 503 right away instead of queueing without bound.
+workers = int(os.environ.get('RECOMMENDER_WORKERS','0'))
+max_queue = int(os.environ.get('RECOMMENDER_QUEUE','64'))
+pool = ProcessPoolExecutor(workers,mp_context=multiprocessing.get_context('fork')) if workers else None
+pending = 0
 
 app = FastAPI()
+# Compress responses for clients that send Accept-Encoding: gzip
+app.add_middleware(GZipMiddleware,minimum_size=1000)
+
+
+# Responses are encoded straight from the result columns in the layout of
+# the response models, which then only document the schema
+RECIPE_SCHEMA={name:field.type_ for name,field in Recipe.__fields__.items()}
+
+
+def score_many(groups):
+    """
+    Recommend and encode (as JSON, or Arrow when ``item_params['format']``
+    says so) for each (targets, ingredients, item_params) group, one
+    batched call per group. Runs in a worker process when pooled.
+    """
+    output=[]
+    for inputs,ingredients,item_params in groups:
+        if item_params.get('format')=='arrow':
+            # Text columns are copied into Arrow from the store's buffers,
+            # so the engine only materializes the numeric ones
+            fields=item_params.get('fields') or list(RECIPE_SCHEMA)
+            numeric=[name for name in fields if name not in text_fields(dataset,fields)]
+            results=recommend_many(engine,inputs,ingredients,{**item_params,'fields':numeric})
+            output.append([encode_arrow(dataset,r,RECIPE_SCHEMA,fields) for r in results])
+        else:
+            output.append([encode_recipes(r,RECIPE_SCHEMA) for r in recommend_many(engine,inputs,ingredients,item_params)])
+    return output
+
+
+def score(nutrition_input,ingredients,item_params):
+    """``score_many`` for a single target."""
+    return score_many([([nutrition_input],ingredients,item_params)])[0][0]
+
+
+def wants_arrow(accept):
+    """Whether the Accept header asks for an Arrow stream (406 without pyarrow)."""
+    if not accept or ARROW_STREAM not in accept:
+        return False
+    if pa is None:
+        raise HTTPException(status_code=406,detail="Arrow responses need pyarrow installed on the server")
+    return True
 
 
-class params(BaseModel):
-    n_neighbors:int=5
-    return_distance:bool=False
+async def dispatch(function,*args):
+    """Run ``function`` in the worker pool (or threadpool), bounded by ``max_queue``."""
+    global pending
+    if pending>=max_queue:
+        raise HTTPException(status_code=503,detail="Too many pending requests")
+    pending+=1
+    try:
+        if pool is None:
+            return await run_in_threadpool(function,*args)
+        return await asyncio.wrap_future(pool.submit(function,*args))
+    finally:
+        pending-=1
 
-class PredictionIn(BaseModel):
-    nutrition_input:conlist(float, min_items=9, max_items=9)
-    ingredients:list[str]=[]
-    params:Optional[params]
 
+@app.on_event("startup")
+async def start_workers():
+    # Fork every worker now, with the dataset loaded and no request running
+    if pool is not None:
+        await asyncio.gather(*[asyncio.wrap_future(pool.submit(os.getpid)) for _ in range(workers)])
 
-class Recipe(BaseModel):
-    Name:str
-    CookTime:str
-    PrepTime:str
-    TotalTime:str
-    RecipeIngredientParts:list[str]
-    Calories:float
-    FatContent:float
-    SaturatedFatContent:float
-    CholesterolContent:float
-    SodiumContent:float
-    CarbohydrateContent:float
-    FiberContent:float
-    SugarContent:float
-    ProteinContent:float
-    RecipeInstructions:list[str]
 
-class PredictionOut(BaseModel):
-    output: Optional[List[Recipe]] = None
+@app.on_event("shutdown")
+def stop_workers():
+    if pool is not None:
+        pool.shutdown()
+
+
+def request_params(request,arrow=False):
+    """
+    Engine params of a request, with ``summary`` turned into ``fields``.
+    The response format is part of them, so cached results are per format.
+    """
+    engine_params=request.dict()
+    if engine_params.pop('summary'):
+        engine_params['fields']=SUMMARY_FIELDS
+    if arrow:
+        engine_params['format']='arrow'
+    return engine_params
 
 
 @app.get("/")
@@ -49,11 +122,61 @@ def home():
 
 
 @app.post("/predict/",response_model=PredictionOut)
-def update_item(prediction_input:PredictionIn):
-    recommendation_dataframe=recommend(dataset,prediction_input.nutrition_input,prediction_input.ingredients,prediction_input.params.dict())
-    output=output_recommended_recipes(recommendation_dataframe)
-    if output is None:
-        return {"output":None}
-    else:
-        return {"output":output}
+async def update_item(prediction_input:PredictionIn,accept:Optional[str]=Header(None)):
+    arrow=wants_arrow(accept)
+    request=(prediction_input.nutrition_input,prediction_input.ingredients,request_params(prediction_input.params or params(),arrow))
+    key=cache.key(*request)
+    found,output=cache.lookup(key)
+    if not found:
+        output=await dispatch(score,*request)
+        cache.store(key,output)
+    if arrow:
+        return Response(output,media_type=ARROW_STREAM)
+    return Response(b'{"output":'+output+b'}',media_type="application/json")
+
+
+@app.post("/predict/batch",response_model=BatchOut)
+async def predict_batch(batch_input:BatchIn,accept:Optional[str]=Header(None)):
+    arrow=wants_arrow(accept)
+    output={}
+    groups={}
+    shared_params=batch_input.params or params()
+    for index,item in enumerate(batch_input.items):
+        ingredients=batch_input.ingredients if item.ingredients is None else item.ingredients
+        item_params=request_params(item.params or shared_params,arrow)
+        key=cache.key(item.nutrition_input,ingredients,item_params)
+        found,output[index]=cache.lookup(key)
+        if not found:
+            # Items with exactly the same ingredients and params are scored together
+            group=groups.setdefault((tuple(ingredients),json.dumps(item_params,sort_keys=True)),(ingredients,item_params,[]))
+            group[2].append((index,key,item.nutrition_input))
+    if groups:
+        found=await dispatch(score_many,[([x for _,_,x in items],ingredients,item_params)
+                                          for ingredients,item_params,items in groups.values()])
+        for (_,_,items),results in zip(groups.values(),found):
+            for (index,key,_),result in zip(items,results):
+                output[index]=result
+                cache.store(key,result)
+    if arrow:
+        return Response(merge_arrow([output[index] for index in range(len(output))]),media_type=ARROW_STREAM)
+    body=b','.join(b'"%d":%s'%(index,output[index]) for index in range(len(output)))
+    return Response(b'{"output":{'+body+b'}}',media_type="application/json")
+
+
+@app.get("/queue")
+def queue_depth():
+    return {"pending":pending,"max_queue":max_queue,"workers":workers}
+
+
+@app.get("/cache/stats")
+def cache_stats():
+    return cache.stats()
+
 
+@app.get("/recipes/{recipe_id}",response_model=RecipeDetail)
+def get_recipe(recipe_id:int):
+    # Details are read from the artifact's on-disk buffers for this row only
+    row=dataset.rows_for_ids([recipe_id])[0]
+    if row<0 or not engine.valid[row]:
+        raise HTTPException(status_code=404,detail="Recipe not found")
+    return dataset.take([row],['RecipeId','Name',*DETAIL_COLUMNS]).to_dict("records")[0]
@@ -1,85 +1,162 @@
+import json
+from json.encoder import encode_basestring
 import numpy as np
-import re
+from recommendation_engine import ListColumn,RecommendationEngine,StringColumn
 
+# Arrow responses are optional; without pyarrow they are refused
+try:
+    import pyarrow as pa
+except ImportError:
+    pa=None
 
-UNWANTED_NAME_KEYWORDS = [
-    "clean out",
-    "cleanout",
-    "clean-out",
-    "hot sauce",
-]
+ARROW_STREAM='application/vnd.apache.arrow.stream'
 
 
-def _filter_valid_recipes(df):
-    if "Name" not in df.columns:
-        return df
+def build_engine(store,precision='float32',n_shards=1):
+    """
+    Build the recommendation engine once. Invalid recipe names are masked
+    out by the store's precomputed validity mask; ``precision`` is the
+    storage type of the searched feature matrix and ``n_shards`` the number
+    of threads scoring it.
+    """
+    return RecommendationEngine(store, precision=precision, n_shards=n_shards)
 
-    mask = np.ones(len(df), dtype=bool)
-    name_series = df["Name"].astype(str)
-    for kw in UNWANTED_NAME_KEYWORDS:
-        mask &= ~name_series.str.contains(kw, case=False, na=False).to_numpy()
-    return df[mask]
 
-
-def extract_data(dataframe,ingredients):
-    extracted_data=dataframe.copy()
-    extracted_data=_filter_valid_recipes(extracted_data)
-    extracted_data=extract_ingredient_filtered_data(extracted_data,ingredients)
-    return extracted_data
-    
-def extract_ingredient_filtered_data(dataframe,ingredients):
-    extracted_data=dataframe.copy()
-    regex_string=''.join(map(lambda x:f'(?=.*{x})',ingredients))
-    extracted_data=extracted_data[extracted_data['RecipeIngredientParts'].str.contains(regex_string,regex=True,flags=re.IGNORECASE)]
-    return extracted_data
-
-def recommend(dataframe,_input,ingredients=[],params={'n_neighbors':5,'return_distance':False}):
+def recommend(engine,_input,ingredients=[],params={'n_neighbors':5,'return_distance':False},cache=None):
         """
         Pure NumPy implementation equivalent to the original scikit-learn
-        NearestNeighbors pipeline used by the FastAPI backend.
+        NearestNeighbors pipeline used by the FastAPI backend. The nutrition
+        matrix is standardized once in ``engine``. Results are looked up in
+        and added to ``cache`` (a ``ResultCache``) when one is given.
         """
-        extracted_data = extract_data(dataframe, ingredients)
-        k = params.get('n_neighbors', 5)
-
-        if extracted_data.shape[0] < k:
-            return None
-
-        # Nutrition feature columns (consistent with frontend)
-        features = extracted_data.iloc[:, 6:15].to_numpy(dtype=float)
-
-        # Standardize features
-        mean = features.mean(axis=0)
-        std = features.std(axis=0)
-        std[std == 0] = 1.0
-        features_std = (features - mean) / std
-
-        # Standardize input vector
-        x = np.array(_input, dtype=float).reshape(1, -1)
-        x_std = (x - mean) / std
+        if cache is not None:
+            return cache.recommend(engine, _input, ingredients, params)
+        return engine.recommend(_input, ingredients, params)
 
-        # Cosine similarity
-        x_norm = np.linalg.norm(x_std, axis=1, keepdims=True)
-        X_norm = np.linalg.norm(features_std, axis=1, keepdims=True)
-        sim = (features_std @ x_std.T) / (X_norm * x_norm + 1e-12)
-
-        top_k_idx = np.argsort(-sim[:, 0])[:k]
-        return extracted_data.iloc[top_k_idx]
-
-def extract_quoted_strings(s):
-    # Find all the strings inside double quotes
-    strings = re.findall(r'"([^"]*)"', s)
-    # Join the strings with 'and'
-    return strings
+def recommend_many(engine,inputs,ingredients=[],params={'n_neighbors':5,'return_distance':False}):
+        """
+        Batched ``recommend``: scores all nutrition targets in ``inputs`` in
+        one matrix multiply and returns one result per target.
+        """
+        return engine.recommend_many(inputs, ingredients, params)
 
 def output_recommended_recipes(dataframe):
     if dataframe is not None:
-        output_df = dataframe.copy()
-        output_df = _filter_valid_recipes(output_df)
-        output=output_df.to_dict("records")
-        for recipe in output:
-            recipe['RecipeIngredientParts']=extract_quoted_strings(recipe['RecipeIngredientParts'])
-            recipe['RecipeInstructions']=extract_quoted_strings(recipe['RecipeInstructions'])
+        # ``dataframe`` only holds the k recommended rows, all of them valid
+        # recipes; to_dict builds fresh records, so no defensive copy is
+        # needed. Ingredient and instruction lists were parsed at load time.
+        output=dataframe.to_dict("records")
     else:
         output=None
     return output
 
+
+def _encode_value(value):
+    if isinstance(value,list):
+        return '['+','.join([encode_basestring(str(item)) for item in value])+']'
+    return 'null' if value is None else encode_basestring(str(value))
+
+def _encode_column(values,field_type):
+    """JSON text of each value of one result column, coerced to ``field_type``."""
+    if len(values)==0:
+        return []
+    if field_type in (int,float) and values.dtype.kind in 'fiub':
+        # One C-level dumps for the whole column; numbers contain no commas
+        return json.dumps(values.astype(field_type).tolist(),separators=(',',':'))[1:-1].split(',')
+    return [_encode_value(value) for value in values.tolist()]
+
+def encode_recipes(dataframe,schema):
+    """
+    JSON array of the recommended recipes as bytes, or ``null``.
+
+    The same text FastAPI's JSONResponse renders for validated ``Recipe``
+    records, built column by column instead of record by record. ``schema``
+    maps each field to its type (``str`` for lists of strings too); only
+    fields present in ``dataframe`` are written, in ``schema`` order.
+    """
+    if dataframe is None:
+        return b'null'
+    names=[name for name in schema if name in dataframe.columns]
+    if not names:
+        return ('['+','.join(['{}']*len(dataframe))+']').encode()
+    columns=[_encode_column(dataframe[name].to_numpy(),schema[name]) for name in names]
+    keys=['{'+encode_basestring(names[0])+':']+[','+encode_basestring(name)+':' for name in names[1:]]
+    rows=(''.join([key+value for key,value in zip(keys,row)])+'}' for row in zip(*columns))
+    return ('['+','.join(rows)+']').encode()
+
+
+def _gather_strings(column,rows):
+    """Arrow strings of ``rows`` of a ``StringColumn``, copied buffer to buffer."""
+    starts=np.asarray(column.offsets[rows])
+    lengths=np.asarray(column.offsets[rows+1])-starts
+    offsets=np.zeros(len(rows)+1,dtype=np.int64)
+    np.cumsum(lengths,out=offsets[1:])
+    positions=np.repeat(starts-offsets[:-1],lengths)+np.arange(offsets[-1])
+    data=np.asarray(column.data)[positions]
+    return pa.LargeStringArray.from_buffers(len(rows),pa.py_buffer(offsets),pa.py_buffer(data))
+
+def _gather_lists(column,rows):
+    """Arrow lists of strings of ``rows`` of a ``ListColumn``, built from its offsets."""
+    starts=np.asarray(column.offsets[rows])
+    lengths=np.asarray(column.offsets[rows+1])-starts
+    offsets=np.zeros(len(rows)+1,dtype=np.int64)
+    np.cumsum(lengths,out=offsets[1:])
+    items=np.repeat(starts-offsets[:-1],lengths)+np.arange(offsets[-1])
+    return pa.LargeListArray.from_arrays(pa.array(offsets),_gather_strings(column.items,items))
+
+def text_fields(store,fields):
+    """The ``fields`` that ``encode_arrow`` reads from the store's buffers."""
+    return [name for name in fields if isinstance(store.columns.get(name),(StringColumn,ListColumn))]
+
+def encode_arrow(store,dataframe,schema,fields=None):
+    """
+    Arrow IPC stream with one record batch of the recommended recipes; no
+    rows when there is no result.
+
+    Numeric fields are wrapped from ``dataframe``'s arrays without a copy.
+    Text and list fields (``text_fields``) are gathered for its rows
+    straight from the store's UTF-8 buffers and offsets, so ``dataframe``
+    need not hold them. ``fields`` (default: all of ``schema``) limits the
+    columns.
+    """
+    rows=np.zeros(0,dtype=np.int64) if dataframe is None else dataframe.index.to_numpy()
+    names,arrays=[],[]
+    for name in (schema if fields is None else [name for name in schema if name in fields]):
+        column=store.columns.get(name)
+        if isinstance(column,StringColumn):
+            arrays.append(_gather_strings(column,rows))
+        elif isinstance(column,ListColumn):
+            arrays.append(_gather_lists(column,rows))
+        elif dataframe is not None and name in dataframe.columns:
+            arrays.append(pa.array(np.asarray(dataframe[name].to_numpy(),dtype=schema[name])))
+        elif column is not None:
+            arrays.append(pa.array(np.zeros(0,dtype=schema[name])))
+        else:
+            continue
+        names.append(name)
+    batch=pa.RecordBatch.from_arrays(arrays,names=names)
+    sink=pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink,batch.schema) as writer:
+        writer.write_batch(batch)
+    return sink.getvalue().to_pybytes()
+
+def merge_arrow(streams):
+    """
+    One Arrow IPC stream of the per-item ``encode_arrow`` streams: a record
+    batch per item, tagged with an ``item`` index column. Columns missing
+    from an item (other ``fields``) are null.
+    """
+    tables=[]
+    for index,stream in enumerate(streams):
+        table=pa.ipc.open_stream(stream).read_all()
+        tables.append(table.add_column(0,'item',pa.array(np.full(table.num_rows,index,dtype=np.int32))))
+    # An empty batch still gets a valid stream, with just the item column
+    schema=pa.unify_schemas([table.schema for table in tables]) if tables else pa.schema([('item',pa.int32())])
+    sink=pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink,schema) as writer:
+        for table in tables:
+            for field in schema:
+                if field.name not in table.column_names:
+                    table=table.append_column(field,pa.nulls(table.num_rows,field.type))
+            writer.write_table(table.select(schema.names))
+    return sink.getvalue().to_pybytes()
@@ -0,0 +1,1206 @@
+"""
+Precomputed nutrition feature matrix for the recipe recommender.
+
+The engine standardizes and L2-normalizes the nine nutrition columns once,
+when the dataset is loaded, so that a query only costs one mat-vec plus a
+top-k selection instead of re-slicing and re-scaling the whole dataset.
+
+The dataset itself is held column by column in a ``RecipeStore``. Parsing
+the gzipped CSV takes several seconds, so the store can be saved once as a
+directory of ``.npy`` files next to the CSV:
+
+    python recommendation_engine.py build ../Data/dataset_enhanced.csv
+
+``load_recipe_store`` prefers that artifact and falls back to the CSV. The
+artifact is opened with ``mmap_mode='r'``, so every worker process on a
+host shares one page-cache copy of the feature matrix and offset tables.
+
+This module has no Streamlit/FastAPI dependency and is kept identical in
+``FastAPI_Backend`` and ``Streamlit_Frontend``.
+"""
+
+import argparse
+import itertools
+import json
+import os
+import re
+import threading
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+
+# Numeric nutrition features (columns 6:15 in the original dataset)
+NUTRITION_COLUMNS = [
+    'Calories',
+    'FatContent',
+    'SaturatedFatContent',
+    'CholesterolContent',
+    'SodiumContent',
+    'CarbohydrateContent',
+    'FiberContent',
+    'SugarContent',
+    'ProteinContent',
+]
+
+# Rows scored per matrix multiply; bounds the (queries x rows) score block.
+BLOCK_ROWS = 65536
+
+# Diversity re-ranking picks from this many times ``n_neighbors`` candidates
+MMR_POOL_FACTOR = 4
+# Buckets of the hashed name/ingredient word signature
+SIGNATURE_DIM = 64
+
+# Upper bound on the (points x centroids) score block of k-means
+KMEANS_BLOCK = 1 << 22
+
+# R-style c("...") columns, parsed into lists once when the store is built
+LIST_COLUMNS = ['RecipeIngredientParts', 'RecipeInstructions']
+CATEGORICAL_COLUMNS = ['Cuisine']
+
+# Bytes of matching row ids ``IngredientIndex`` keeps for recently used
+# query words (least recently used first out). Query words come from
+# clients, so the cache is bounded by size; a word matching more rows than
+# a quarter of the budget is never cached.
+WORD_CACHE_BYTES = 4 << 20
+
+# Heavy per-recipe columns, only read for the rows a client actually shows
+DETAIL_COLUMNS = ['CookTime', 'PrepTime', 'TotalTime', 'RecipeIngredientParts', 'RecipeInstructions']
+
+# Names of clearly non-meal entries that slip through from the Food.com
+# dump (maintenance tips, condiments), matched case-insensitively
+UNWANTED_NAME_KEYWORDS = [
+    "clean out",
+    "cleanout",
+    "clean-out",
+    "hot sauce",
+    "nuevo laredo",
+]
+_UNWANTED_NAME_PATTERN = '|'.join(map(re.escape, UNWANTED_NAME_KEYWORDS))
+
+# Rough price (USD) of a typical amount of an ingredient. An ingredient is
+# priced by the first key it contains; each one adds 30% of that price.
+RECIPE_PRICES = {
+    'chicken': 3.5,
+    'beef': 5.5,
+    'pork': 4.0,
+    'turkey': 4.5,
+    'fish': 6.5,
+    'salmon': 8.0,
+    'shrimp': 9.0,
+    'tuna': 3.0,
+    'cheese': 4.5,
+    'milk': 2.5,
+    'cream': 3.5,
+    'butter': 3.0,
+    'egg': 2.5,
+    'rice': 2.0,
+    'pasta': 1.8,
+    'bread': 2.5,
+    'flour': 2.0,
+    'sugar': 2.5,
+    'oil': 3.5,
+    'olive oil': 6.0,
+    'tomato': 2.0,
+    'onion': 1.5,
+    'garlic': 1.0,
+    'potato': 2.0,
+    'carrot': 1.5,
+    'broccoli': 2.5,
+    'spinach': 2.5,
+    'lettuce': 2.0,
+    'pepper': 2.5,
+    'mushroom': 3.0,
+    'avocado': 2.0,
+    'lemon': 1.0,
+    'lime': 1.0,
+    'apple': 3.0,
+    'banana': 2.0,
+    'berry': 4.0,
+    'herbs': 2.5,
+    'spice': 3.0,
+    'sauce': 2.5,
+    'broth': 2.0,
+    'stock': 2.5,
+    'wine': 8.0,
+    'vinegar': 2.5
+}
+
+# Storage precisions of the engine's feature matrix. float64 is rebuilt
+# from the raw nutrition values, not upcast from the store's float32 copy.
+# Versus float64, float32 similarities differ by ~1e-7 (the same top-k up
+# to such near-ties). int8 (symmetric per-column scales) changes a
+# similarity by at most ||scale|| / 2 ~= 0.01, so near-ties can swap.
+# ``benchmark.py precision`` measures both against float64 (1M synthetic
+# rows: float32 recall@10 1.000, max error 1.3e-7; int8 0.910, 5.6e-3).
+PRECISIONS = ('float64', 'float32', 'int8')
+
+ARTIFACT_VERSION = 5
+
+
+def _scaler_stats(features):
+    """Mean/std of each column, equivalent to StandardScaler."""
+    mean = features.mean(axis=0)
+    std = features.std(axis=0)
+    std[std == 0] = 1.0
+    return mean, std
+
+
+def _normalize_rows(features):
+    norms = np.linalg.norm(features, axis=1, keepdims=True)
+    return features / (norms + 1e-12)
+
+
+def _top_k(scores, k, ids=None):
+    """
+    Positions of the ``k`` largest ``scores``, best first.
+
+    Uses partial selection (introselect) and only sorts the winners. Ties
+    are broken by ``ids`` (the positions themselves by default), so results
+    do not depend on how introselect happened to split equal scores.
+    """
+    n = scores.shape[0]
+    if k <= 0:
+        return np.zeros(0, dtype=np.intp)
+    if k < n:
+        kth = np.partition(scores, n - k)[n - k]
+        above = np.flatnonzero(scores > kth)
+        tied = np.flatnonzero(scores == kth)
+        if ids is not None:
+            tied = tied[np.argsort(ids[tied], kind='stable')]
+        idx = np.concatenate([above, tied[:k - above.shape[0]]])
+    else:
+        idx = np.arange(n)
+    tie_break = idx if ids is None else ids[idx]
+    return idx[np.lexsort((tie_break, -scores[idx]))]
+
+
+def _mmr(relevance, similarity, k, diversity):
+    """
+    Maximal marginal relevance: greedily pick ``k`` candidates, each one
+    maximizing ``(1 - diversity) * relevance - diversity * redundancy``,
+    where redundancy is its highest ``similarity`` to the picks so far.
+    Returns candidate positions in pick order.
+    """
+    picked = np.zeros(relevance.shape[0], dtype=bool)
+    redundancy = np.zeros(relevance.shape[0])
+    order = []
+    for _ in range(k):
+        score = (1 - diversity) * relevance - diversity * redundancy
+        score[picked] = -np.inf
+        best = int(np.argmax(score))
+        order.append(best)
+        picked[best] = True
+        redundancy = np.maximum(redundancy, similarity[best])
+    return np.array(order, dtype=np.int64)
+
+
+def _word_signatures(texts, dim=SIGNATURE_DIM):
+    """
+    L2-normalized hashed bag of words of each text. crc32 keeps the buckets
+    stable across processes, unlike ``hash``.
+    """
+    signatures = np.zeros((len(texts), dim))
+    for i, text in enumerate(texts):
+        for word in re.findall(r'\w+', text.lower()):
+            signatures[i, zlib.crc32(word.encode('utf-8')) % dim] += 1
+    return _normalize_rows(signatures)
+
+
+def _nearest_centroid(points, centroids):
+    """Index of the most similar (unit) centroid for each (unit) point."""
+    step = max(1, KMEANS_BLOCK // centroids.shape[0])
+    return np.concatenate([
+        np.argmax(points[start:start + step] @ centroids.T, axis=1)
+        for start in range(0, points.shape[0], step)
+    ])
+
+
+def _kmeans(points, n_clusters, n_iter=10, seed=0):
+    """
+    Spherical k-means (cosine) over unit ``points`` with Lloyd iterations.
+    Empty clusters are re-seeded with random points.
+    """
+    rng = np.random.default_rng(seed)
+    centroids = points[rng.choice(points.shape[0], n_clusters, replace=False)]
+    for _ in range(n_iter):
+        labels = _nearest_centroid(points, centroids)
+        sums = np.stack([
+            np.bincount(labels, weights=points[:, j], minlength=n_clusters)
+            for j in range(points.shape[1])
+        ], axis=1)
+        empty = np.bincount(labels, minlength=n_clusters) == 0
+        sums[empty] = points[rng.choice(points.shape[0], int(empty.sum()))]
+        centroids = _normalize_rows(sums).astype(points.dtype)
+    return centroids
+
+
+def _quantize(features, precision):
+    """
+    ``features`` stored at ``precision`` plus the per-column scale mapping
+    them back (``features ~= stored * scale``). Scales are folded into the
+    query instead of being applied to the matrix.
+    """
+    if precision not in PRECISIONS:
+        raise ValueError(f"precision must be one of {PRECISIONS}, not {precision!r}")
+    if precision == 'int8':
+        scale = np.abs(features).max(axis=0).astype(np.float32) / 127
+        scale[scale == 0] = 1.0
+        return np.round(features / scale).astype(np.int8), scale
+    return np.asarray(features, dtype=precision), np.ones(features.shape[1], dtype=precision)
+
+
+def _save_array(directory, name, array):
+    np.save(os.path.join(directory, name + '.npy'), array)
+
+
+def _load_array(directory, name, mmap_mode=None):
+    return np.load(os.path.join(directory, name + '.npy'), mmap_mode=mmap_mode)
+
+
+def valid_name_mask(names):
+    """
+    Boolean mask of the recipe ``names`` that are non-empty and contain
+    none of ``UNWANTED_NAME_KEYWORDS``. All keywords are matched in a
+    single pass with one alternation regex.
+    """
+    names = pd.Series(names, dtype=object).fillna('').astype(str)
+    unwanted = names.str.contains(_UNWANTED_NAME_PATTERN, case=False, regex=True)
+    return ((names != '') & ~unwanted).to_numpy(dtype=bool)
+
+
+def parse_r_lists(series):
+    """Items of each R-style ``c("a", "b")`` string in ``series``."""
+    return series.fillna('').astype(str).str.findall(r'"([^"]*)"').tolist()
+
+
+def estimate_costs(ingredients, prices=RECIPE_PRICES):
+    """
+    Estimated cost of every recipe in the ``ingredients`` ``ListColumn``,
+    following the same rules as ``estimate_recipe_cost`` in the frontend.
+
+    Each distinct ingredient string is priced once, one vectorized
+    substring pass per price key; per-recipe totals are then summed with
+    ``np.bincount`` over the list offsets.
+    """
+    counts = np.diff(ingredients.offsets)
+    codes, unique = pd.factorize(np.asarray(ingredients.items.to_list(), dtype=object))
+    unique = pd.Series(unique, dtype=object).str.lower()
+    item_price = np.full(len(unique), np.nan)
+    # Reversed, so the first matching key in ``prices`` is written last
+    for key, price in reversed(list(prices.items())):
+        item_price[unique.str.contains(key, regex=False).to_numpy()] = price
+    matched = ~np.isnan(item_price)
+    # Priced ingredients add 30% of their base price, unknown ones 1.5
+    item_cost = np.where(matched, item_price * 0.3, 1.5)
+
+    recipe_of_item = np.repeat(np.arange(counts.shape[0]), counts)
+    total = np.bincount(recipe_of_item, weights=item_cost[codes], minlength=counts.shape[0])
+    n_matched = np.bincount(recipe_of_item, weights=matched[codes], minlength=counts.shape[0])
+    # Recipes with few priced ingredients get a per-ingredient floor
+    few = n_matched < counts * 0.3
+    total[few] = np.maximum(total[few], counts[few] * 1.2)
+    total[counts == 0] = 5.0
+    return np.round(total, 2)
+
+
+class RowBitmap:
+    """
+    A set of row ids held as a packed bitmap (``np.packbits`` layout, one
+    bit per row), e.g. the recipes already used in a meal plan.
+    """
+
+    def __init__(self, n_rows, rows=()):
+        self.n_rows = n_rows
+        self.bits = np.zeros((n_rows + 7) // 8, dtype=np.uint8)
+        self.add(rows)
+
+    def add(self, rows):
+        rows = np.asarray(rows, dtype=np.int64).ravel()
+        np.bitwise_or.at(self.bits, rows >> 3, (128 >> (rows & 7)).astype(np.uint8))
+
+    def __contains__(self, row):
+        return bool(self.bits[row >> 3] & (128 >> (row & 7)))
+
+    def mask(self):
+        """The set as a boolean mask over all rows."""
+        return np.unpackbits(self.bits, count=self.n_rows).view(bool)
+
+
+class StringColumn:
+    """UTF-8 strings stored as one byte buffer plus row offsets."""
+
+    def __init__(self, data, offsets):
+        self.data = data
+        self.offsets = offsets
+
+    @classmethod
+    def from_values(cls, values):
+        encoded = [value.encode('utf-8') if isinstance(value, str) else b'' for value in values]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(value) for value in encoded], out=offsets[1:])
+        return cls(np.frombuffer(b''.join(encoded), dtype=np.uint8), offsets)
+
+    def __len__(self):
+        return self.offsets.shape[0] - 1
+
+    def __getitem__(self, row):
+        return self.data[self.offsets[row]:self.offsets[row + 1]].tobytes().decode('utf-8')
+
+    def take(self, rows):
+        return [self[row] for row in rows]
+
+    def to_list(self):
+        buffer = self.data.tobytes()
+        offsets = self.offsets.tolist()
+        return [buffer[start:stop].decode('utf-8') for start, stop in zip(offsets[:-1], offsets[1:])]
+
+    def save(self, directory, name):
+        _save_array(directory, name + '.data', self.data)
+        _save_array(directory, name + '.offsets', self.offsets)
+
+    @classmethod
+    def load(cls, directory, name, mmap_mode=None):
+        return cls(_load_array(directory, name + '.data', mmap_mode),
+                   _load_array(directory, name + '.offsets', mmap_mode))
+
+
+class ListColumn:
+    """Lists of strings: a ``StringColumn`` of items plus per-row offsets."""
+
+    def __init__(self, items, offsets):
+        self.items = items
+        self.offsets = offsets
+
+    @classmethod
+    def from_lists(cls, lists):
+        offsets = np.zeros(len(lists) + 1, dtype=np.int64)
+        np.cumsum([len(items) for items in lists], out=offsets[1:])
+        return cls(StringColumn.from_values(list(itertools.chain.from_iterable(lists))), offsets)
+
+    def __len__(self):
+        return self.offsets.shape[0] - 1
+
+    def __getitem__(self, row):
+        return self.items.take(range(self.offsets[row], self.offsets[row + 1]))
+
+    def take(self, rows):
+        return [self[row] for row in rows]
+
+    def save(self, directory, name):
+        self.items.save(directory, name + '.items')
+        _save_array(directory, name + '.offsets', self.offsets)
+
+    @classmethod
+    def load(cls, directory, name, mmap_mode=None):
+        return cls(StringColumn.load(directory, name + '.items', mmap_mode),
+                   _load_array(directory, name + '.offsets', mmap_mode))
+
+
+class IngredientIndex:
+    """
+    Inverted index from ingredient tokens to the rows that use them.
+
+    Postings are stored CSR-style: the rows of ``vocab[i]`` are
+    ``rows[offsets[i]:offsets[i + 1]]``, sorted ascending, so ingredient
+    queries become intersections/unions of sorted row-id arrays.
+
+    Query terms use the same list the API takes (``["milk", "eggs"]``);
+    every term must match (AND). A term may list alternatives separated by
+    ``|`` (OR) and a leading ``-`` excludes recipes that match it (NOT).
+    A term matches a recipe when each of its words is a substring of one of
+    the recipe's ingredient words, so "egg" still matches "eggs".
+    """
+
+    def __init__(self, vocab, offsets, rows, n_rows):
+        self.vocab = vocab
+        self.offsets = offsets
+        self.rows = rows
+        self.n_rows = n_rows
+        self._vocab_text = None
+        self._word_cache = OrderedDict()
+        self._word_cache_bytes = 0
+        self._word_lock = threading.Lock()
+
+    @classmethod
+    def from_lists(cls, ingredient_lists):
+        """Build the index from each recipe's list of ingredients."""
+        tokens = (
+            pd.Series(ingredient_lists, dtype=object)
+            .str.join(' ')
+            .str.lower()
+            .str.findall(r'\w+')
+            .explode()
+            .dropna()
+        )
+        codes, vocab = pd.factorize(tokens.to_numpy(), sort=True)
+        n_rows = len(ingredient_lists)
+        # One posting per (token, row) pair, sorted by token then row
+        pairs = np.unique(codes.astype(np.int64) * n_rows + tokens.index.to_numpy())
+        rows = (pairs % n_rows).astype(np.int32)
+        offsets = np.searchsorted(pairs // n_rows, np.arange(len(vocab) + 1))
+        return cls(np.asarray(vocab, dtype=object), offsets, rows, n_rows)
+
+    def save(self, directory):
+        StringColumn.from_values(self.vocab).save(directory, 'index.vocab')
+        _save_array(directory, 'index.offsets', self.offsets)
+        _save_array(directory, 'index.rows', self.rows)
+
+    @classmethod
+    def load(cls, directory, n_rows, mmap_mode=None):
+        vocab = np.asarray(StringColumn.load(directory, 'index.vocab').to_list(), dtype=object)
+        return cls(vocab, _load_array(directory, 'index.offsets', mmap_mode),
+                   _load_array(directory, 'index.rows', mmap_mode), n_rows)
+
+    def _word_rows(self, word):
+        """Sorted rows with an ingredient word containing ``word``."""
+        with self._word_lock:
+            if word in self._word_cache:
+                self._word_cache.move_to_end(word)
+                return self._word_cache[word]
+        if self._vocab_text is None:
+            self._vocab_text = self.vocab.astype(str)
+        token_ids = np.flatnonzero(np.char.find(self._vocab_text, word) >= 0)
+        postings = [self.rows[self.offsets[i]:self.offsets[i + 1]] for i in token_ids]
+        rows = np.unique(np.concatenate(postings)) if postings else self.rows[:0]
+        if rows.nbytes > WORD_CACHE_BYTES // 4:
+            return rows
+        with self._word_lock:
+            if word not in self._word_cache:
+                self._word_cache[word] = rows
+                self._word_cache_bytes += rows.nbytes
+            while self._word_cache_bytes > WORD_CACHE_BYTES:
+                self._word_cache_bytes -= self._word_cache.popitem(last=False)[1].nbytes
+        return rows
+
+    def _term_rows(self, term):
+        result = None
+        for word in re.findall(r'\w+', term.lower()):
+            rows = self._word_rows(word)
+            result = rows if result is None else np.intersect1d(result, rows, assume_unique=True)
+        return result
+
+    def _any_rows(self, terms):
+        matches = [rows for rows in map(self._term_rows, terms) if rows is not None]
+        return np.unique(np.concatenate(matches)) if matches else None
+
+    def any_mask(self, terms):
+        """
+        Boolean mask of the recipes matching at least one of ``terms``, or
+        None when the terms contain no words.
+        """
+        rows = self._any_rows(terms)
+        if rows is None:
+            return None
+        mask = np.zeros(self.n_rows, dtype=bool)
+        mask[rows] = True
+        return mask
+
+    def query(self, ingredients):
+        """
+        Sorted row ids of the recipes matching an ingredient query, or None
+        when no term has any words (e.g. ``['']``), i.e. nothing to filter.
+        """
+        result = None
+        excluded = []
+        for item in ingredients:
+            item = item.strip()
+            if item.startswith('-'):
+                excluded.extend(item[1:].split('|'))
+                continue
+            rows = self._any_rows(item.split('|'))
+            if rows is not None:
+                result = rows if result is None else np.intersect1d(result, rows, assume_unique=True)
+        rows = self._any_rows(excluded)
+        if result is None:
+            if rows is None:
+                return None
+            result = np.arange(self.n_rows, dtype=np.int32)
+        if rows is not None:
+            result = np.setdiff1d(result, rows, assume_unique=True)
+        return result
+
+
+class IVFIndex:
+    """
+    Inverted-file index over the feature matrix, for approximate search.
+
+    Rows are clustered with spherical k-means; a query only scores the
+    rows of the ``nprobe`` lists whose centroids are most similar to it.
+    Lists are stored CSR-style like ``IngredientIndex`` postings: the rows
+    of list ``i`` are ``rows[offsets[i]:offsets[i + 1]]``.
+    """
+
+    def __init__(self, centroids, offsets, rows):
+        self.centroids = centroids
+        self.offsets = offsets
+        self.rows = rows
+
+    def __len__(self):
+        return self.centroids.shape[0]
+
+    @classmethod
+    def build(cls, features, n_lists=None, sample_per_list=64, seed=0):
+        """
+        Cluster ``features`` into ``n_lists`` lists (about sqrt(n) by
+        default); k-means is trained on a sample of ``sample_per_list``
+        rows per list, then every row is assigned to its nearest centroid.
+        """
+        n_rows = features.shape[0]
+        n_lists = min(n_rows, n_lists or max(1, int(np.sqrt(n_rows))))
+        rng = np.random.default_rng(seed)
+        sample = np.sort(rng.choice(n_rows, min(n_rows, n_lists * sample_per_list), replace=False))
+        centroids = _kmeans(np.asarray(features[sample]), n_lists, seed=seed)
+        labels = _nearest_centroid(features, centroids)
+        rows = np.argsort(labels, kind='stable').astype(np.int32)
+        offsets = np.searchsorted(labels[rows], np.arange(n_lists + 1))
+        return cls(centroids, offsets, rows)
+
+    def candidates(self, query, nprobe):
+        """Rows of the ``nprobe`` lists closest to ``query``."""
+        lists = _top_k(self.centroids @ query, min(nprobe, len(self)))
+        return np.concatenate([self.rows[self.offsets[i]:self.offsets[i + 1]] for i in lists])
+
+    def save(self, directory):
+        _save_array(directory, 'ivf.centroids', self.centroids)
+        _save_array(directory, 'ivf.offsets', self.offsets)
+        _save_array(directory, 'ivf.rows', self.rows)
+
+    @classmethod
+    def load(cls, directory, mmap_mode=None):
+        return cls(_load_array(directory, 'ivf.centroids'),
+                   _load_array(directory, 'ivf.offsets'),
+                   _load_array(directory, 'ivf.rows', mmap_mode))
+
+
+class RecipeStore:
+    """
+    Column-oriented, read-only recipe dataset.
+
+    Numeric columns are NumPy arrays, ``Cuisine`` is categorical and text
+    columns are ``StringColumn``/``ListColumn`` buffers that are only
+    decoded for the rows actually returned by ``take``.
+
+    The nine nutrition columns are views into one (n x 9) ``nutrition``
+    matrix, stored next to its standardized, L2-normalized float32 copy
+    ``features`` and the scaler statistics used to build it. ``valid`` is
+    the precomputed mask of recipes with a usable name; the scaler is
+    fitted on those rows only. ``EstimatedCost`` is precomputed from
+    ``RECIPE_PRICES`` when the store is built.
+
+    Rows are grouped by ``Cuisine`` (stable, so dataset order is kept within
+    a cuisine): every cuisine is one contiguous row range, and therefore
+    one contiguous block of ``features``.
+
+    Loaded from an artifact, the ``DETAIL_COLUMNS`` stay on disk: their
+    offset tables point into memory-mapped buffers, so fetching one recipe
+    by row id reads only that recipe's bytes.
+
+    ``ivf_index`` is the optional ``IVFIndex`` built with the artifact.
+    """
+
+    def __init__(self, columns, ingredient_index, nutrition, features, mean, std, valid, ivf_index=None):
+        self.columns = columns
+        self.ingredient_index = ingredient_index
+        self.nutrition = nutrition
+        self.features = features
+        self.mean = mean
+        self.std = std
+        self.valid = valid
+        self.ivf_index = ivf_index
+        cuisine = columns['Cuisine']
+        self.cuisine_offsets = np.searchsorted(cuisine.codes, np.arange(len(cuisine.categories) + 1))
+        self._id_order = None
+
+    def __len__(self):
+        return self.nutrition.shape[0]
+
+    def rows_for_ids(self, recipe_ids):
+        """Row ids of the given ``RecipeId`` values, -1 where unknown."""
+        recipe_ids = np.asarray(recipe_ids)
+        if 'RecipeId' not in self.columns:
+            return np.where((recipe_ids >= 0) & (recipe_ids < len(self)), recipe_ids, -1)
+        all_ids = self.columns['RecipeId']
+        if self._id_order is None:
+            self._id_order = np.argsort(all_ids, kind='stable')
+        positions = np.searchsorted(all_ids, recipe_ids, sorter=self._id_order)
+        rows = self._id_order[np.minimum(positions, len(self) - 1)]
+        return np.where(all_ids[rows] == recipe_ids, rows, -1)
+
+    def cuisine_ranges(self, cuisines):
+        """(start, stop) row ranges of the given cuisines, in row order."""
+        categories = self.columns['Cuisine'].categories
+        codes = sorted(set(categories.get_indexer(list(cuisines))) - {-1})
+        return [(int(self.cuisine_offsets[c]), int(self.cuisine_offsets[c + 1])) for c in codes]
+
+    @classmethod
+    def from_dataframe(cls, dataframe):
+        """
+        Build a store from the CSV layout. The ``c("...")`` columns are
+        parsed into lists here, once, so responses only slice them.
+        """
+        if 'Cuisine' not in dataframe.columns:
+            dataframe = dataframe.assign(Cuisine='Other')
+        cuisine = pd.Categorical(dataframe['Cuisine'].fillna('Other').astype(str))
+        dataframe = dataframe.iloc[np.argsort(cuisine.codes, kind='stable')].reset_index(drop=True)
+        nutrition = np.ascontiguousarray(dataframe[NUTRITION_COLUMNS].to_numpy(dtype=float))
+        if 'Name' in dataframe.columns:
+            valid = valid_name_mask(dataframe['Name'])
+        else:
+            valid = np.ones(len(dataframe), dtype=bool)
+        mean, std = _scaler_stats(nutrition[valid])
+        features = _normalize_rows((nutrition - mean) / std).astype(np.float32)
+        columns = {}
+        ingredient_lists = None
+        for name in dataframe.columns:
+            series = dataframe[name]
+            if name in NUTRITION_COLUMNS:
+                columns[name] = nutrition[:, NUTRITION_COLUMNS.index(name)]
+            elif name in CATEGORICAL_COLUMNS:
+                columns[name] = pd.Categorical(series.fillna('Other').astype(str))
+            elif name in LIST_COLUMNS:
+                lists = parse_r_lists(series)
+                columns[name] = ListColumn.from_lists(lists)
+                if name == 'RecipeIngredientParts':
+                    ingredient_lists = lists
+            elif pd.api.types.is_numeric_dtype(series):
+                columns[name] = series.to_numpy()
+            else:
+                columns[name] = StringColumn.from_values(series.to_numpy())
+        columns['EstimatedCost'] = estimate_costs(columns['RecipeIngredientParts'])
+        ingredient_index = IngredientIndex.from_lists(ingredient_lists)
+        return cls(columns, ingredient_index, nutrition, features, mean, std, valid)
+
+    def take(self, rows, columns=None):
+        """
+        Materialize ``rows`` (optionally only ``columns``) as a DataFrame
+        indexed by row id.
+        """
+        data = {}
+        for name, column in self.columns.items():
+            if columns is not None and name not in columns:
+                continue
+            if isinstance(column, (StringColumn, ListColumn)):
+                data[name] = column.take(rows)
+            else:
+                data[name] = column[rows]
+        return pd.DataFrame(data, index=rows)
+
+    def save(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        meta = {'version': ARTIFACT_VERSION, 'n_rows': len(self), 'columns': [],
+                'scaler': {'mean': self.mean.tolist(), 'std': self.std.tolist()}}
+        _save_array(directory, 'nutrition', self.nutrition)
+        _save_array(directory, 'features', self.features)
+        _save_array(directory, 'valid', self.valid)
+        for name, column in self.columns.items():
+            if name in NUTRITION_COLUMNS:
+                meta['columns'].append({'name': name, 'kind': 'nutrition'})
+            elif isinstance(column, StringColumn):
+                meta['columns'].append({'name': name, 'kind': 'string'})
+                column.save(directory, name)
+            elif isinstance(column, ListColumn):
+                meta['columns'].append({'name': name, 'kind': 'list'})
+                column.save(directory, name)
+            elif isinstance(column, pd.Categorical):
+                meta['columns'].append({'name': name, 'kind': 'categorical',
+                                        'categories': column.categories.tolist()})
+                _save_array(directory, name + '.codes', column.codes)
+            else:
+                meta['columns'].append({'name': name, 'kind': 'numeric'})
+                _save_array(directory, name, column)
+        self.ingredient_index.save(directory)
+        if self.ivf_index is not None:
+            self.ivf_index.save(directory)
+            meta['ivf'] = True
+        # Written last: a directory without meta.json is an incomplete build
+        with open(os.path.join(directory, 'meta.json'), 'w') as f:
+            json.dump(meta, f)
+
+    @classmethod
+    def load(cls, directory, mmap_mode='r'):
+        """
+        Open an artifact. Arrays are memory-mapped read-only by default, so
+        processes loading the same artifact share its pages.
+        """
+        with open(os.path.join(directory, 'meta.json')) as f:
+            meta = json.load(f)
+        if meta['version'] != ARTIFACT_VERSION:
+            raise ValueError(f"{directory} was built by an older version; rebuild it")
+        nutrition = _load_array(directory, 'nutrition', mmap_mode)
+        features = _load_array(directory, 'features', mmap_mode)
+        valid = _load_array(directory, 'valid', mmap_mode)
+        columns = {}
+        for column in meta['columns']:
+            name, kind = column['name'], column['kind']
+            if kind == 'nutrition':
+                columns[name] = nutrition[:, NUTRITION_COLUMNS.index(name)]
+            elif kind == 'string':
+                columns[name] = StringColumn.load(directory, name, mmap_mode)
+            elif kind == 'list':
+                columns[name] = ListColumn.load(directory, name, mmap_mode)
+            elif kind == 'categorical':
+                columns[name] = pd.Categorical.from_codes(
+                    _load_array(directory, name + '.codes'), column['categories'])
+            else:
+                columns[name] = _load_array(directory, name, mmap_mode)
+        ingredient_index = IngredientIndex.load(directory, meta['n_rows'], mmap_mode)
+        ivf_index = IVFIndex.load(directory, mmap_mode) if meta.get('ivf') else None
+        mean = np.array(meta['scaler']['mean'])
+        std = np.array(meta['scaler']['std'])
+        return cls(columns, ingredient_index, nutrition, features, mean, std, valid, ivf_index)
+
+
+def artifact_path(csv_path):
+    """Directory of the columnar artifact built from ``csv_path``."""
+    return os.path.splitext(csv_path)[0] + '.columns'
+
+
+def build_artifact(csv_path, directory=None, ivf_lists=None):
+    """
+    Parse ``csv_path`` once and save it as a columnar artifact, together
+    with an ``IVFIndex`` of ``ivf_lists`` lists (about sqrt(n) by default).
+    """
+    dataframe = pd.read_csv(csv_path, compression='gzip')
+    directory = directory or artifact_path(csv_path)
+    store = RecipeStore.from_dataframe(dataframe)
+    store.ivf_index = IVFIndex.build(store.features, ivf_lists)
+    store.save(directory)
+    return directory
+
+
+def load_recipe_store(csv_path):
+    """Load the artifact built from ``csv_path``, or parse the CSV itself."""
+    directory = artifact_path(csv_path)
+    if os.path.exists(os.path.join(directory, 'meta.json')):
+        return RecipeStore.load(directory)
+    return RecipeStore.from_dataframe(pd.read_csv(csv_path, compression='gzip'))
+
+
+class RecommendationEngine:
+    """
+    Searches the standardized, L2-normalized nutrition matrix of a
+    ``RecipeStore``.
+
+    Cosine similarity against a query then reduces to ``features @ x``.
+    ``valid`` is the boolean mask of the rows that may be returned; it
+    defaults to the store's precomputed name-validity mask and is applied
+    before scoring, so results never need re-checking.
+
+    ``precision`` is the storage type of the searched matrix, one of
+    ``PRECISIONS``. With int8 the matrix takes a quarter of the float32
+    bytes and its per-column ``scale`` is multiplied into each query.
+    ``n_shards`` is the number of threads exhaustive search is split over.
+    """
+
+    def __init__(self, store, valid=None, precision='float32', n_shards=1):
+        self.store = store
+        self.valid = store.valid if valid is None else valid
+        # Raw values are kept for locally rescaled queries
+        self.nutrition = store.nutrition
+        self.mean, self.std = store.mean, store.std
+        features = store.features
+        if precision == 'float64':
+            # The store's matrix is float32 already; rebuild it exactly
+            features = _normalize_rows((store.nutrition - store.mean) / store.std)
+        self.features, self.scale = _quantize(features, precision)
+        self.ingredient_index = store.ingredient_index
+        self.n_valid = int(self.valid.sum())
+        self.cost = store.columns['EstimatedCost']
+        self.n_shards = n_shards
+        # Threads are only started on first use
+        self._pool = ThreadPoolExecutor(max_workers=n_shards) if n_shards > 1 else None
+
+    def __len__(self):
+        return self.features.shape[0]
+
+    def _subset(self, ingredients, local_rescale=False):
+        """
+        Candidate rows, scaler statistics, feature block and per-column
+        query scale for an ingredient filter.
+
+        By default the subset's rows are gathered from the pre-standardized
+        matrix, so a target ranks recipes the same with or without a filter.
+        With ``local_rescale`` the scaler is refitted on the filtered subset,
+        as the original scikit-learn pipeline did.
+        """
+        rows = self.ingredient_index.query(ingredients) if ingredients else None
+        if rows is None:
+            return None, self.mean, self.std, self.features, self.scale
+        rows = rows[self.valid[rows]]
+        if not local_rescale:
+            return rows, self.mean, self.std, self.features[rows], self.scale
+        features = self.nutrition[rows]
+        mean, std = _scaler_stats(features)
+        return rows, mean, std, _normalize_rows((features - mean) / std), np.ones(features.shape[1])
+
+    def _constraint_mask(self, params):
+        """
+        Boolean mask of the valid rows that satisfy the constraints in
+        ``params``: ``include_ingredients`` (match at least one),
+        ``exclude_ingredients`` (match none), ``max_cost``, ``exclude_rows``
+        (a ``RowBitmap`` or row ids) and ``exclude_ids`` (``RecipeId``
+        values). ``cuisines`` are handled by searching only their row
+        ranges.
+        """
+        mask = self.valid
+        include = params.get('include_ingredients')
+        if include:
+            matches = self.ingredient_index.any_mask(include)
+            if matches is not None:
+                mask = mask & matches
+        exclude = params.get('exclude_ingredients')
+        if exclude:
+            matches = self.ingredient_index.any_mask(exclude)
+            if matches is not None:
+                mask = mask & ~matches
+        max_cost = params.get('max_cost')
+        if max_cost is not None:
+            mask = mask & (self.cost <= max_cost)
+        excluded = params.get('exclude_rows')
+        if excluded is not None:
+            if not isinstance(excluded, RowBitmap):
+                excluded = RowBitmap(len(self), np.fromiter(excluded, dtype=np.int64))
+            mask = mask & ~excluded.mask()
+        exclude_ids = params.get('exclude_ids')
+        if exclude_ids:
+            rows = self.store.rows_for_ids(np.fromiter(exclude_ids, dtype=np.int64))
+            mask = mask.copy() if mask is self.valid else mask
+            mask[rows[rows >= 0]] = False
+        return mask
+
+    def _score_shard(self, features, queries, k, mask, blocks):
+        """
+        Top-k positions and similarities of each block of one shard, per
+        query. Blocks are scored one at a time to bound memory.
+        """
+        m = queries.shape[0]
+        block_idx = [[] for _ in range(m)]
+        block_sim = [[] for _ in range(m)]
+        for start, stop in blocks:
+            sim = queries @ features[start:stop].T
+            if mask is not None:
+                sim[:, ~mask[start:stop]] = -np.inf
+            for i in range(m):
+                local = _top_k(sim[i], k)
+                block_idx[i].append(local + start)
+                block_sim[i].append(sim[i, local])
+        return block_idx, block_sim
+
+    def _search(self, features, queries, k, mask=None, ranges=None):
+        """
+        Positions and similarities of the ``k`` most similar rows of
+        ``features`` for each row of ``queries``, best first. Only rows in
+        the (start, stop) ``ranges`` are scored (all rows by default), and
+        rows outside the boolean ``mask`` are never returned.
+
+        The rows are cut into blocks, grouped into ``n_shards`` contiguous
+        shards that are scored in parallel on a thread pool (NumPy releases
+        the GIL in the matmul and the selection). Each block keeps its own
+        top-k and the winners are merged at the end.
+        """
+        if ranges is None:
+            ranges = [(0, features.shape[0])]
+        n_rows = sum(stop - start for start, stop in ranges)
+        block_rows = max(1, min(BLOCK_ROWS, -(-n_rows // self.n_shards)))
+        blocks = [
+            (start, min(start + block_rows, stop))
+            for first, stop in ranges
+            for start in range(first, stop, block_rows)
+        ]
+        if self._pool is not None and len(blocks) > 1:
+            shards = [blocks[shard[0]:shard[-1] + 1]
+                      for shard in np.array_split(np.arange(len(blocks)), min(self.n_shards, len(blocks)))]
+            parts = list(self._pool.map(lambda shard: self._score_shard(features, queries, k, mask, shard), shards))
+        else:
+            parts = [self._score_shard(features, queries, k, mask, blocks)]
+
+        results = []
+        for i in range(queries.shape[0]):
+            idx = np.concatenate([block for block_idx, _ in parts for block in block_idx[i]])
+            sim = np.concatenate([block for _, block_sim in parts for block in block_sim[i]])
+            order = _top_k(sim, k, idx)
+            results.append((idx[order], sim[order]))
+        return results
+
+    def _ivf(self):
+        """The store's ``IVFIndex``, built on first use when it has none."""
+        if self.store.ivf_index is None:
+            self.store.ivf_index = IVFIndex.build(self.store.features)
+        return self.store.ivf_index
+
+    def _search_ivf(self, queries, k, mask, ranges, nprobe):
+        """
+        Approximate ``_search`` over the whole feature matrix: only rows in
+        the ``nprobe`` closest IVF lists are scored. When those lists hold
+        fewer than ``k`` admissible rows, ``nprobe`` is doubled until they
+        do, so a result is never short.
+        """
+        index = self._ivf()
+        results = []
+        for query in queries:
+            probes = nprobe
+            while True:
+                rows = index.candidates(query, probes)
+                keep = mask[rows]
+                if ranges is not None:
+                    keep &= np.any([(rows >= start) & (rows < stop) for start, stop in ranges], axis=0)
+                rows = rows[keep]
+                if rows.shape[0] >= k or probes >= len(index):
+                    break
+                probes *= 2
+            sim = self.features[rows] @ query
+            order = _top_k(sim, k, rows)
+            results.append((rows[order], sim[order]))
+        return results
+
+    def _diversify(self, features, scale, rows, idx, sim, k, diversity):
+        """
+        Re-rank the candidates ``idx`` (positions in ``features``) with MMR
+        and return the positions of the ``k`` picks. Two recipes are
+        similar when their nutrition vectors are, and when their names and
+        ingredients share words.
+        """
+        store_rows = idx if rows is None else rows[idx]
+        nutrition = _normalize_rows(features[idx] * scale.astype(float))
+        names = _word_signatures(self.store.columns['Name'].take(store_rows))
+        ingredients = _word_signatures(
+            [' '.join(items) for items in self.store.columns['RecipeIngredientParts'].take(store_rows)])
+        similarity = (nutrition @ nutrition.T + names @ names.T + ingredients @ ingredients.T) / 3
+        return _mmr(sim.astype(float), similarity, k, diversity)
+
+    def recommend_many(self, inputs, ingredients=[], params={'n_neighbors': 5, 'return_distance': False}):
+        """
+        Score an (m x 9) block of nutrition targets in one pass.
+
+        Returns one result per target, each the ``n_neighbors`` most similar
+        recipes or None when fewer recipes match the filter and constraints.
+        Filtering works on row ids; only the returned rows are materialized.
+        With ``return_distance`` the cosine similarity of each recipe is
+        returned in a ``Similarity`` column.
+
+        The constraints accepted by ``_constraint_mask`` (included/excluded
+        ingredients, ``max_cost``, excluded rows) are applied as a mask
+        while scoring, so every result holds exactly ``n_neighbors`` recipes
+        that satisfy them, without overfetching. ``cuisines`` restricts the
+        search to those cuisines' contiguous row ranges, which makes it
+        cheaper than an unrestricted query.
+
+        Targets are standardized with the scaler fitted on the whole
+        dataset, even when ``ingredients`` narrows the candidates. Set
+        ``local_rescale`` to refit it on the ingredient-filtered subset for
+        every query instead, as the original pipeline did.
+
+        ``nprobe`` switches to approximate search with the IVF index,
+        scoring only the rows of the ``nprobe`` lists closest to each target
+        (see ``benchmark.py ann`` for recall). Ingredient-filtered queries
+        always search their subset exactly.
+
+        ``diversity`` (0 to 1, default 0) re-ranks the ``MMR_POOL_FACTOR *
+        n_neighbors`` best candidates with maximal marginal relevance, so
+        near-identical variants of one recipe do not crowd the result.
+
+        ``fields`` limits the returned columns; columns left out (e.g. the
+        ``DETAIL_COLUMNS`` text) are never decoded.
+        """
+        k = params.get('n_neighbors', 5)
+        x = np.array(inputs, dtype=float).reshape(-1, len(NUTRITION_COLUMNS))
+        if k <= 0:
+            # Nothing to search for: empty results, as the original pipeline gave
+            recipes = self.store.take(np.zeros(0, dtype=np.int64), params.get('fields'))
+            if params.get('return_distance', False):
+                recipes = recipes.assign(Similarity=np.zeros(0))
+            return [recipes.copy() for _ in range(x.shape[0])]
+
+        rows, mean, std, features, scale = self._subset(ingredients, params.get('local_rescale', False))
+        mask = self._constraint_mask(params)
+        ranges = None
+        if params.get('cuisines'):
+            ranges = self.store.cuisine_ranges(params['cuisines'])
+        if rows is not None:
+            # Rows of the subset are valid already, and sorted, so each
+            # cuisine range maps to a contiguous range of the subset
+            mask = None if mask is self.valid else mask[rows]
+            if ranges is not None:
+                ranges = [(np.searchsorted(rows, start), np.searchsorted(rows, stop)) for start, stop in ranges]
+        if mask is self.valid and ranges is None:
+            n_candidates = self.n_valid
+        else:
+            n_rows = self.features.shape[0] if rows is None else rows.shape[0]
+            n_candidates = sum(
+                stop - start if mask is None else np.count_nonzero(mask[start:stop])
+                for start, stop in ([(0, n_rows)] if ranges is None else ranges)
+            )
+        if n_candidates < k:
+            return [None] * x.shape[0]
+
+        diversity = params.get('diversity') or 0
+        pool = min(k * MMR_POOL_FACTOR, n_candidates) if diversity else k
+
+        queries = (_normalize_rows((x - mean) / std) * scale).astype(scale.dtype)
+        results = []
+        nprobe = params.get('nprobe')
+        if nprobe and rows is None:
+            found = self._search_ivf(queries, pool, mask, ranges, nprobe)
+        else:
+            found = self._search(features, queries, pool, mask, ranges)
+        for top_k_idx, sim in found:
+            if diversity:
+                picks = self._diversify(features, scale, rows, top_k_idx, sim, k, diversity)
+                top_k_idx, sim = top_k_idx[picks], sim[picks]
+            if rows is not None:
+                top_k_idx = rows[top_k_idx]
+            recipes = self.store.take(top_k_idx, params.get('fields'))
+            if params.get('return_distance', False):
+                recipes = recipes.assign(Similarity=sim)
+            results.append(recipes)
+        return results
+
+    def recommend(self, _input, ingredients=[], params={'n_neighbors': 5, 'return_distance': False}):
+        """
+        Return the ``n_neighbors`` recipes most similar to ``_input``, or
+        None when fewer recipes match the filter and constraints.
+        """
+        return self.recommend_many([_input], ingredients, params)[0]
+
+
+def _term_words(term):
+    """The words of a term, all of which a recipe must match."""
+    return tuple(sorted(set(re.findall(r'\w+', term.lower()))))
+
+
+def _normalize_terms(terms):
+    """Canonical form of ``IngredientIndex.any_mask`` terms."""
+    return tuple(sorted({words for words in map(_term_words, terms) if words}))
+
+
+def _normalize_query(ingredients):
+    """
+    Canonical form of an ``IngredientIndex.query`` list: order, case and
+    repeats do not matter, but each ``|`` alternative stays a term of its
+    own and excluded (``-``) terms stay apart from included ones. Every
+    excluded alternative is excluded on its own, so ``-a|b`` is keyed
+    like ``-a`` plus ``-b``.
+    """
+    terms = set()
+    for item in ingredients:
+        item = item.strip()
+        if item.startswith('-'):
+            terms.update(('-', (words,)) for words in _normalize_terms(item[1:].split('|')))
+        else:
+            alternatives = _normalize_terms(item.split('|'))
+            if alternatives:
+                terms.add(('', alternatives))
+    return tuple(sorted(terms))
+
+
+class ResultCache:
+    """
+    Thread-safe LRU cache of ``RecommendationEngine.recommend`` results.
+
+    Results are keyed on the target quantized to multiples of
+    ``granularity`` (in the units of each nutrition column), the
+    normalized ingredient query and the constraints in ``params``, so
+    near-identical targets share the result computed for the first of
+    them. At most ``max_size`` results are kept; ``hits`` and ``misses``
+    count lookups. Requests with ``exclude_rows`` depend on mutable state
+    and bypass the cache.
+    """
+
+    def __init__(self, max_size=1024, granularity=1.0):
+        self.max_size = max_size
+        self.granularity = granularity
+        self.hits = 0
+        self.misses = 0
+        self._results = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._results)
+
+    def key(self, target, ingredients, params):
+        """Cache key of a request, or None when it cannot be cached."""
+        if params.get('exclude_rows') is not None:
+            return None
+        target = np.round(np.asarray(target, dtype=float) / self.granularity).astype(np.int64)
+        constraints = []
+        for name, value in sorted(params.items()):
+            # Missing and empty/default-off values are the same request; 0
+            # only means "off" for these two (max_cost=0 is a real budget)
+            if value is None or value is False or (isinstance(value, (list, tuple)) and not value):
+                continue
+            if name in ('diversity', 'nprobe') and value == 0:
+                continue
+            if name in ('include_ingredients', 'exclude_ingredients'):
+                value = _normalize_terms(value)
+            elif isinstance(value, (list, tuple)):
+                value = tuple(sorted(value))
+            constraints.append((name, value))
+        return tuple(target.tolist()), _normalize_query(ingredients), tuple(constraints)
+
+    def lookup(self, key):
+        """``(True, result)`` for a cached key, else ``(False, None)``."""
+        if key is None:
+            return False, None
+        with self._lock:
+            if key not in self._results:
+                self.misses += 1
+                return False, None
+            self.hits += 1
+            self._results.move_to_end(key)
+            return True, self._results[key]
+
+    def store(self, key, result):
+        """Cache ``result`` under ``key``, evicting the least recently used."""
+        if key is None:
+            return
+        with self._lock:
+            self._results[key] = result
+            while len(self._results) > self.max_size:
+                self._results.popitem(last=False)
+
+    def recommend_many(self, engine, inputs, ingredients=[], params={'n_neighbors': 5, 'return_distance': False}):
+        """
+        ``engine.recommend_many``: cached targets are answered from the
+        cache and the rest are scored together in one batched call.
+        """
+        keys = [self.key(x, ingredients, params) for x in inputs]
+        results = [None] * len(keys)
+        missing = []
+        for i, key in enumerate(keys):
+            found, results[i] = self.lookup(key)
+            if not found:
+                missing.append(i)
+        if missing:
+            found = engine.recommend_many([inputs[i] for i in missing], ingredients, params)
+            for i, result in zip(missing, found):
+                results[i] = result
+                self.store(keys[i], result)
+        return results
+
+    def recommend(self, engine, _input, ingredients=[], params={'n_neighbors': 5, 'return_distance': False}):
+        """``engine.recommend``, answered from the cache when possible."""
+        return self.recommend_many(engine, [_input], ingredients, params)[0]
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'size': len(self._results), 'max_size': self.max_size}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Recipe recommendation engine tools.')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    build = subparsers.add_parser('build', help='convert the dataset CSV into a columnar artifact')
+    build.add_argument('csv_path', nargs='?', default=os.path.join('..', 'Data', 'dataset_enhanced.csv'))
+    build.add_argument('--output', help='artifact directory (default: next to the CSV)')
+    build.add_argument('--ivf-lists', type=int, help='lists of the approximate-search index (default: sqrt of the row count)')
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        print(f"Wrote {build_artifact(args.csv_path, args.output, args.ivf_lists)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""
+Request and response models of the FastAPI backend.
+
+Kept apart from ``main`` so they can be imported (e.g. by ``benchmark.py``)
+without loading the dataset.
+"""
+
+from pydantic import BaseModel,confloat,conint,conlist,validator
+from typing import Dict,List,Optional
+from recommendation_engine import DETAIL_COLUMNS
+
+
+class params(BaseModel):
+    n_neighbors:conint(ge=1)=5
+    return_distance:bool=False
+    max_cost:Optional[float]=None
+    cuisines:Optional[list[str]]=None
+    include_ingredients:list[str]=[]
+    exclude_ingredients:list[str]=[]
+    exclude_ids:list[int]=[]
+    diversity:confloat(ge=0,le=1)=0
+    nprobe:Optional[conint(ge=1)]=None
+    local_rescale:bool=False
+    # Only return these Recipe fields; summary drops the heavy text fields
+    fields:Optional[list[str]]=None
+    summary:bool=False
+
+    @validator('fields')
+    def known_fields(cls,fields):
+        unknown=[name for name in fields or [] if name not in Recipe.__fields__]
+        if unknown:
+            raise ValueError(f'unknown Recipe fields: {", ".join(unknown)}')
+        return fields
+
+    @validator('summary')
+    def summary_or_fields(cls,summary,values):
+        if summary and values.get('fields') is not None:
+            raise ValueError('pass either fields or summary, not both')
+        return summary
+
+class PredictionIn(BaseModel):
+    nutrition_input:conlist(float, min_items=9, max_items=9)
+    ingredients:list[str]=[]
+    params:Optional[params]
+
+
+# Fields are optional so that projected responses validate; fields that
+# were not requested are left out of the response entirely
+class Recipe(BaseModel):
+    RecipeId:Optional[int]=None
+    Name:Optional[str]=None
+    CookTime:Optional[str]=None
+    PrepTime:Optional[str]=None
+    TotalTime:Optional[str]=None
+    RecipeIngredientParts:Optional[list[str]]=None
+    Calories:Optional[float]=None
+    FatContent:Optional[float]=None
+    SaturatedFatContent:Optional[float]=None
+    CholesterolContent:Optional[float]=None
+    SodiumContent:Optional[float]=None
+    CarbohydrateContent:Optional[float]=None
+    FiberContent:Optional[float]=None
+    SugarContent:Optional[float]=None
+    ProteinContent:Optional[float]=None
+    RecipeInstructions:Optional[list[str]]=None
+    EstimatedCost:Optional[float]=None
+    Similarity:Optional[float]=None
+
+SUMMARY_FIELDS=[name for name in Recipe.__fields__ if name not in DETAIL_COLUMNS]
+
+class PredictionOut(BaseModel):
+    output: Optional[List[Recipe]] = None
+
+
+class BatchItem(BaseModel):
+    nutrition_input:conlist(float, min_items=9, max_items=9)
+    # Unset fields fall back to the batch's shared values
+    ingredients:Optional[list[str]]=None
+    params:Optional[params]
+
+class BatchIn(BaseModel):
+    items:list[BatchItem]
+    ingredients:list[str]=[]
+    params:Optional[params]
+
+class BatchOut(BaseModel):
+    output: Dict[int,Optional[List[Recipe]]]
+
+
+class RecipeDetail(BaseModel):
+    RecipeId:int
+    Name:str
+    CookTime:str
+    PrepTime:str
+    TotalTime:str
+    RecipeIngredientParts:list[str]
+    RecipeInstructions:list[str]
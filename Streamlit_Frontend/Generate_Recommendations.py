@@ -1,45 +1,15 @@
-import numpy as np
-import re
-import pandas as pd
 import streamlit as st
 import os
-
-
-# Heuristic filters to drop clearly non-food / noisy recipe names that slip
-# through from the original dataset (e.g. maintenance-related terms).
-UNWANTED_NAME_KEYWORDS = [
-    "clean out",
-    "cleanout",
-    "clean-out",
-    "hot sauce",
-]
-
-# Extra substrings to aggressively filter out known non-meal entries
-BLOCKED_NAME_SUBSTRINGS = [
-    *[kw.lower() for kw in UNWANTED_NAME_KEYWORDS],
-    "nuevo laredo",
-]
-
-
-def is_valid_recipe_name(name: str) -> bool:
-    """Return False for clearly invalid/non-meal recipe names."""
-    if not name:
-        return False
-    name_l = str(name).lower()
-    return not any(bad in name_l for bad in BLOCKED_NAME_SUBSTRINGS)
-
-
-def _filter_valid_recipes(df: pd.DataFrame) -> pd.DataFrame:
-    if "Name" not in df.columns:
-        return df
-
-    mask = df["Name"].apply(is_valid_recipe_name)
-    return df[mask]
+from recommendation_engine import RecommendationEngine, ResultCache, artifact_path, load_recipe_store
 
 
 # Load dataset once at module level
 @st.cache(allow_output_mutation=True)
 def load_dataset():
+    """
+    Load the recipes as a ``RecipeStore``, preferring the columnar artifact
+    built by ``python recommendation_engine.py build`` over the CSV.
+    """
     # Try multiple paths for different deployment scenarios.
     # We now standardize on the enhanced dataset only to keep the repo smaller.
     possible_paths = [
@@ -49,82 +19,61 @@ def load_dataset():
     ]
     
     for dataset_path in possible_paths:
-        if os.path.exists(dataset_path):
-            df = pd.read_csv(dataset_path, compression='gzip')
-            # Check if Cuisine column exists, if not add it as 'Other'
-            if 'Cuisine' not in df.columns:
-                df['Cuisine'] = 'Other'
-            df = _filter_valid_recipes(df)
-            return df
+        if os.path.exists(dataset_path) or os.path.exists(artifact_path(dataset_path)):
+            # A missing Cuisine column is filled with 'Other' by the store
+            return load_recipe_store(dataset_path)
     
     # If none found, raise error
     raise FileNotFoundError("Could not find dataset_enhanced.csv in expected locations")
 
-def extract_data(dataframe, ingredients):
-    extracted_data = dataframe.copy()
-    extracted_data = extract_ingredient_filtered_data(extracted_data, ingredients)
-    return extracted_data
-
+@st.cache(allow_output_mutation=True)
+def load_engine():
+    """
+    Build the recommendation engine once per process. Invalid recipe names
+    are masked out by the store's precomputed validity mask.
+    """
+    return RecommendationEngine(load_dataset())
 
-def extract_ingredient_filtered_data(dataframe, ingredients):
-    extracted_data = dataframe.copy()
-    regex_string = ''.join(map(lambda x: f'(?=.*{x})', ingredients))
-    extracted_data = extracted_data[extracted_data['RecipeIngredientParts'].str.contains(
-        regex_string, regex=True, flags=re.IGNORECASE)]
-    return extracted_data
+@st.cache(allow_output_mutation=True)
+def load_result_cache():
+    """
+    One result cache per process. Streamlit reruns the whole page on every
+    widget change, so the same targets are requested again and again.
+    """
+    return ResultCache()
 
 
-def recommend(dataframe, _input, ingredients=[], params={'n_neighbors': 5, 'return_distance': False}):
+def recommend(engine, _input, ingredients=[], params={'n_neighbors': 5, 'return_distance': False}, cache=None):
     """
     Pure NumPy implementation of the original scikit-learn pipeline:
-    - Standardize numeric nutrition columns
+    - Standardize numeric nutrition columns (precomputed by ``engine``)
     - Compute cosine similarity to the query vector
     - Return top-k most similar recipes
+    Results are looked up in and added to ``cache`` when one is given.
     """
-    extracted_data = extract_data(dataframe, ingredients)
-    k = params.get('n_neighbors', 5)
+    if cache is not None:
+        return cache.recommend(engine, _input, ingredients, params)
+    return engine.recommend(_input, ingredients, params)
 
-    if extracted_data.shape[0] < k:
-        return None
 
-    # Numeric nutrition features are columns 6:15 in the original dataset
-    features = extracted_data.iloc[:, 6:15].to_numpy(dtype=float)
-
-    # Standardize (equivalent to StandardScaler)
-    mean = features.mean(axis=0)
-    std = features.std(axis=0)
-    std[std == 0] = 1.0
-    features_std = (features - mean) / std
-
-    # Standardize input
-    x = np.array(_input, dtype=float).reshape(1, -1)
-    x_std = (x - mean) / std
-
-    # Cosine similarity
-    x_norm = np.linalg.norm(x_std, axis=1, keepdims=True)  # (1, 1)
-    X_norm = np.linalg.norm(features_std, axis=1, keepdims=True)  # (n, 1)
-    sim = (features_std @ x_std.T) / (X_norm * x_norm + 1e-12)  # (n, 1)
-
-    # Take top-k highest similarity
-    top_k_idx = np.argsort(-sim[:, 0])[:k]
-    return extracted_data.iloc[top_k_idx]
-
-
-def extract_quoted_strings(s):
-    strings = re.findall(r'"([^"]*)"', s)
-    return strings
+def recommend_many(engine, inputs, ingredients=[], params={'n_neighbors': 5, 'return_distance': False}, cache=None):
+    """
+    Batched ``recommend``: scores all nutrition targets in ``inputs`` in one
+    matrix multiply and returns one result per target. Targets found in
+    ``cache`` are not scored again.
+    """
+    if cache is not None:
+        return cache.recommend_many(engine, inputs, ingredients, params)
+    return engine.recommend_many(inputs, ingredients, params)
 
 
 def output_recommended_recipes(dataframe):
     if dataframe is not None:
-        output_df = dataframe.copy()
-        # Apply the same name filter to be extra safe even after any
-        # intermediate filtering steps.
-        output_df = _filter_valid_recipes(output_df)
-        output = output_df.to_dict("records")
-        for recipe in output:
-            recipe['RecipeIngredientParts'] = extract_quoted_strings(recipe['RecipeIngredientParts'])
-            recipe['RecipeInstructions'] = extract_quoted_strings(recipe['RecipeInstructions'])
+        # Invalid names were masked out before scoring. ``dataframe`` only
+        # holds the k recommended rows and to_dict builds fresh records, so
+        # no copy. Ingredient and instruction lists were parsed at load time.
+        # The pages key the precomputed cost as ``estimated_cost``.
+        output = dataframe.rename(columns={'EstimatedCost': 'estimated_cost'}).to_dict("records")
     else:
         output = None
     return output
@@ -135,7 +84,8 @@ class Generator:
         self.nutrition_input = nutrition_input
         self.ingredients = ingredients
         self.params = params
-        self.dataset = load_dataset()
+        self.engine = load_engine()
+        self.cache = load_result_cache()
 
     def set_request(self, nutrition_input: list, ingredients: list, params: dict):
         self.nutrition_input = nutrition_input
@@ -145,19 +95,39 @@ class Generator:
     def generate(self):
         # Use local model instead of API call
         recommended = recommend(
-            self.dataset,
+            self.engine,
             self.nutrition_input,
             self.ingredients,
-            self.params
+            self.params,
+            self.cache
         )
         output = output_recommended_recipes(recommended)
-        
-        # Return in same format as API response
-        class Response:
-            def __init__(self):
-                self.status_code = 200
-                
-            def json(self):
-                return {'output': output}
-        
-        return Response()
+        return _Response(output)
+
+    def generate_many(self):
+        """
+        Recommend for several nutrition targets in one batched call.
+
+        ``nutrition_input`` holds a list of targets here; the response's
+        ``output`` holds one recipe list per target, in order.
+        """
+        recommended = recommend_many(
+            self.engine,
+            self.nutrition_input,
+            self.ingredients,
+            self.params,
+            self.cache
+        )
+        output = [output_recommended_recipes(r) for r in recommended]
+        return _Response(output)
+
+
+class _Response:
+    """Mimics the ``requests`` response returned by the FastAPI backend."""
+
+    def __init__(self, output):
+        self.status_code = 200
+        self.output = output
+
+    def json(self):
+        return {'output': self.output}
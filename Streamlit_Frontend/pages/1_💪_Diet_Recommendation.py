@@ -1,10 +1,10 @@
 import streamlit as st
 import pandas as pd
-from Generate_Recommendations import Generator, is_valid_recipe_name
+from Generate_Recommendations import Generator
 from random import uniform as rnd
 from streamlit_echarts import st_echarts
 from llm_chat import generate_chat_answer
-from shopping_list_generator import generate_shopping_list, format_shopping_list_markdown, estimate_shopping_cost, estimate_recipe_cost
+from shopping_list_generator import generate_shopping_list, format_shopping_list_markdown, estimate_shopping_cost
 
 st.set_page_config(page_title="Automatic Diet Recommendation", page_icon="💪",layout="wide")
 
@@ -85,6 +85,7 @@ class Person:
         # Calculate budget per meal - budget is now required
         budget_per_meal = self.budget_limit / len(self.meals_calories_perc)
         
+        nutrition_targets=[]
         for meal in self.meals_calories_perc:
             meal_calories=self.meals_calories_perc[meal]*total_calories
             if meal=='breakfast':        
@@ -95,48 +96,24 @@ class Person:
                 recommended_nutrition = [meal_calories,rnd(20,40),rnd(0,4),rnd(0,30),rnd(0,400),rnd(40,75),rnd(4,20),rnd(0,10),rnd(50,175)] 
             else:
                 recommended_nutrition = [meal_calories,rnd(10,30),rnd(0,4),rnd(0,30),rnd(0,400),rnd(40,75),rnd(4,10),rnd(0,10),rnd(30,100)]
-            
-            # Request more recipes for budget filtering (budget is required)
-            n_neighbors = 25
-            generator=Generator(recommended_nutrition, [], {'n_neighbors': n_neighbors, 'return_distance': False})
-            recommended_recipes=generator.generate().json()['output']
+            nutrition_targets.append(recommended_nutrition)
 
-            # Filter out clearly invalid/non-meal recipes (e.g. sauces, clean-out)
-            recommended_recipes = [
-                r for r in recommended_recipes
-                if is_valid_recipe_name(r.get("Name", ""))
-            ]
-            
-            # Filter by budget - STRICT enforcement (budget is required)
-            if budget_per_meal:
-                filtered_recipes = []
-                for recipe in recommended_recipes:
-                    recipe_cost = estimate_recipe_cost(recipe)
-                    recipe['estimated_cost'] = recipe_cost
-                    # Strict: only include recipes within budget
-                    if recipe_cost <= budget_per_meal:
-                        filtered_recipes.append(recipe)
-                
-                # Sort by cost (cheapest first) and nutritional match
-                filtered_recipes.sort(key=lambda x: x.get('estimated_cost', 999))
-                
-                # Take top recipes within budget
-                if len(filtered_recipes) >= 5:
-                    recommended_recipes = filtered_recipes[:5]
-                elif len(filtered_recipes) > 0:
-                    # Use what we have within budget
-                    recommended_recipes = filtered_recipes
-                else:
-                    # Last resort: take 5 cheapest recipes
-                    recommended_recipes_sorted = sorted(recommended_recipes, key=lambda x: x.get('estimated_cost', 999))
-                    recommended_recipes = recommended_recipes_sorted[:5]
-                    st.warning(f"⚠️ No recipes found within ${budget_per_meal:.2f} budget for {meal}. Showing cheapest options.")
-                
-                recommended_recipes = recommended_recipes[:5]
+        # The budget is applied inside the engine (budget is required), so
+        # each meal gets exactly 5 recipes within budget. All meals are
+        # scored together in one batched call.
+        generator=Generator(nutrition_targets, [], {'n_neighbors': 5, 'return_distance': False, 'max_cost': budget_per_meal})
+        meals_recipes=generator.generate_many().json()['output']
+
+        for meal,recommended_nutrition,recommended_recipes in zip(self.meals_calories_perc,nutrition_targets,meals_recipes):
+            if recommended_recipes is None:
+                # Last resort: take the 5 cheapest of the closest recipes
+                generator.set_request(recommended_nutrition, [], {'n_neighbors': 25, 'return_distance': False})
+                recommended_recipes = generator.generate().json()['output']
+                recommended_recipes = sorted(recommended_recipes, key=lambda x: x['estimated_cost'])[:5]
+                st.warning(f"⚠️ Not enough recipes found within ${budget_per_meal:.2f} budget for {meal}. Showing cheapest options.")
             else:
-                # Add cost estimates even without budget
-                for recipe in recommended_recipes:
-                    recipe['estimated_cost'] = estimate_recipe_cost(recipe)
+                # Sort by cost (cheapest first)
+                recommended_recipes.sort(key=lambda x: x['estimated_cost'])
             
             recommendations.append(recommended_recipes)
         
@@ -1,9 +1,9 @@
 import streamlit as st
-from Generate_Recommendations import Generator, is_valid_recipe_name
+from Generate_Recommendations import Generator
 import pandas as pd
 from streamlit_echarts import st_echarts
 from llm_chat import generate_chat_answer
-from shopping_list_generator import generate_shopping_list, format_shopping_list_markdown, estimate_shopping_cost, estimate_recipe_cost
+from shopping_list_generator import generate_shopping_list, format_shopping_list_markdown, estimate_shopping_cost
 
 st.set_page_config(page_title="Custom Food Recommendation", page_icon="🔍",layout="wide")
 nutrition_values=['Calories','FatContent','SaturatedFatContent','CholesterolContent','SodiumContent','CarbohydrateContent','FiberContent','SugarContent','ProteinContent']
@@ -38,9 +38,9 @@ class Recommendation:
         self.budget_per_recipe=budget_per_recipe
         pass
     def generate(self,):
-        # Request more recipes for budget filtering (budget is required)
-        n_neighbors = self.nb_recommendations * 3
-        params={'n_neighbors':n_neighbors,'return_distance':False}
+        # The budget is applied inside the engine (budget is required), so
+        # exactly nb_recommendations recipes within budget come back
+        params={'n_neighbors':self.nb_recommendations,'return_distance':False,'max_cost':self.budget_per_recipe}
         ingredients=self.ingredient_txt.split(';')
         generator=Generator(self.nutrition_list,ingredients,params)
         recommendations=generator.generate()
@@ -52,32 +52,14 @@ class Recommendation:
         
         budget_warning = None
         
-        if recommendations and len(recommendations) > 0:
-            # Add cost estimates
-            for recipe in recommendations:
-                recipe['estimated_cost'] = estimate_recipe_cost(recipe)
-                # Images removed (text-only UI)
-                pass
-
-            # Filter out clearly invalid/non-meal recipes (e.g. sauces, clean-out)
-            recommendations = [
-                r for r in recommendations
-                if is_valid_recipe_name(r.get("Name", ""))
-            ]
-            
-            # Filter by budget - with fallback
-            if self.budget_per_recipe:
-                budget_filtered = [r for r in recommendations if r['estimated_cost'] <= self.budget_per_recipe]
-                if budget_filtered:
-                    # Only return recipes within budget
-                    recommendations = budget_filtered[:self.nb_recommendations]
-                else:
-                    # If no recipes within budget, take cheapest ones
-                    recommendations = sorted(recommendations, key=lambda x: x['estimated_cost'])[:self.nb_recommendations]
-                    cheapest_cost = recommendations[0]['estimated_cost'] if recommendations else 0
-                    budget_warning = f"⚠️ No recipes found under \\${self.budget_per_recipe:.2f}. Showing cheapest options starting from \\${cheapest_cost:.2f}."
-            else:
-                recommendations = recommendations[:self.nb_recommendations]
+        if recommendations is None and self.budget_per_recipe:
+            # Not enough recipes within budget: take the cheapest close ones
+            generator.set_request(self.nutrition_list, ingredients, {'n_neighbors': self.nb_recommendations * 3, 'return_distance': False})
+            recommendations = generator.generate().json()['output']
+            if recommendations:
+                recommendations = sorted(recommendations, key=lambda x: x['estimated_cost'])[:self.nb_recommendations]
+                cheapest_cost = recommendations[0]['estimated_cost']
+                budget_warning = f"⚠️ Not enough recipes found under \\${self.budget_per_recipe:.2f}. Showing cheapest options starting from \\${cheapest_cost:.2f}."
         
         return recommendations, budget_warning
 
@@ -188,6 +170,7 @@ with st.form("recommendation_form"):
     nb_recommendations = st.slider('Number of recommendations', 5, 20,step=5)
     ingredient_txt=st.text_input('Specify ingredients to include in the recommendations separated by ";" :',placeholder='Ingredient1;Ingredient2;...')
     st.caption('Example: Milk;eggs;butter;chicken...')
+    st.caption('Use "|" for alternatives and a leading "-" to exclude, e.g. chicken|turkey;-mushroom')
     
     st.markdown("---")
     st.markdown("### 💰 Budget per Recipe (Required)")
@@ -5,12 +5,12 @@ Interactive conversational meal planner powered by local LLM
 
 import streamlit as st
 from llm_chat import generate_chat_answer
-from Generate_Recommendations import Generator, is_valid_recipe_name
+from Generate_Recommendations import Generator, load_engine
+from recommendation_engine import RowBitmap
 import pandas as pd
 from shopping_list_generator import (
     generate_shopping_list,
     format_shopping_list_markdown,
-    estimate_recipe_cost,
     estimate_shopping_cost,
 )
 import json
@@ -196,7 +196,8 @@ def generate_meal_plan_with_llm():
     
     # Generate recommendations for each meal for each day
     meal_plan = {}
-    used_recipes = set()  # Track recipes used in this meal plan
+    store = load_engine().store
+    used_recipes = RowBitmap(len(store))  # Rows of the recipes used in this meal plan
     
     # Add some randomization to nutrition targets for variety
     import random
@@ -215,257 +216,94 @@ def generate_meal_plan_with_llm():
 
         for day in range(1, num_days + 1):
             meal_plan[f'Day {day}'] = {}
+
+        # One nutrition target per meal; variety across days comes from the
+        # engine's diversity re-ranking
+        nutrition_targets = {}
+        for meal_name, calories in meal_calories.items():
+            # Add randomization to create variety (±10% variation)
+            cal_variation = random.uniform(0.9, 1.1)
+            varied_calories = calories * cal_variation
             
-            for meal_name, calories in meal_calories.items():
-                # Add randomization to create variety (±10% variation)
-                cal_variation = random.uniform(0.9, 1.1)
-                varied_calories = calories * cal_variation
-                
-                # Create nutrition target with some variation
-                nutrition_target = [
-                    varied_calories,  # Calories
-                    varied_calories * random.uniform(0.025, 0.035),  # Fat variation
-                    varied_calories * 0.007,  # Saturated fat
-                    random.randint(40, 60),  # Cholesterol variation
-                    random.randint(350, 450),  # Sodium variation
-                    varied_calories * random.uniform(0.11, 0.15),  # Carbs variation
-                    random.randint(6, 10),  # Fiber variation
-                    random.randint(8, 12),  # Sugar variation
-                    varied_calories * random.uniform(0.045, 0.055)  # Protein variation
-                ]
-                
-                # Build ingredient filter based on restrictions and cuisines
-                excluded_ingredients = []
-                included_ingredients = []
-                
-                # Dietary restrictions
-                if 'Vegetarian' in dietary_restrictions:
-                    excluded_ingredients.extend(['beef', 'pork', 'chicken', 'fish', 'meat', 'turkey', 'lamb', 'seafood'])
-                if 'Vegan' in dietary_restrictions:
-                    excluded_ingredients.extend(['beef', 'pork', 'chicken', 'fish', 'meat', 'turkey', 'lamb', 'seafood',
-                                                'milk', 'cheese', 'egg', 'butter', 'cream', 'yogurt', 'whey'])
-                
-                # Protein preferences
-                if 'Prefer Chicken' in dietary_restrictions:
-                    included_ingredients.extend(['chicken', 'poultry'])
-                if 'Prefer Fish/Seafood' in dietary_restrictions:
-                    included_ingredients.extend(['fish', 'salmon', 'tuna', 'shrimp', 'seafood', 'prawn', 'cod', 'tilapia'])
-                if 'Prefer Beef' in dietary_restrictions:
-                    included_ingredients.extend(['beef', 'steak', 'ground beef'])
-                if 'Prefer Pork' in dietary_restrictions:
-                    included_ingredients.extend(['pork', 'bacon', 'ham', 'sausage'])
-                
-                # Cuisine-based ingredients (add key ingredients for specific cuisines)
-                cuisine_keywords = []
-                if cuisines and 'Any' not in cuisines:
-                    for cuisine in cuisines:
-                        if cuisine == 'Indian':
-                            cuisine_keywords.extend(['curry', 'garam', 'masala', 'cumin', 'turmeric', 'coriander', 
-                                                    'cardamom', 'tandoori', 'tikka', 'biryani', 'paneer', 'naan',
-                                                    'dal', 'samosa', 'chutney', 'raita', 'korma', 'vindaloo'])
-                        elif cuisine == 'Italian':
-                            cuisine_keywords.extend(['pasta', 'spaghetti', 'linguine', 'penne', 'fettuccine',
-                                                    'tomato', 'basil', 'oregano', 'parmesan', 'parmigiano',
-                                                    'mozzarella', 'olive', 'garlic', 'italian', 'marinara',
-                                                    'pesto', 'risotto', 'pizza', 'lasagna', 'ravioli'])
-                        elif cuisine == 'Mexican':
-                            cuisine_keywords.extend(['taco', 'burrito', 'enchilada', 'quesadilla', 'fajita',
-                                                    'salsa', 'cilantro', 'lime', 'tortilla', 'avocado', 
-                                                    'guacamole', 'cumin', 'chili', 'jalapeño', 'mexican',
-                                                    'nacho', 'tamale', 'poblano', 'chipotle'])
-                        elif cuisine == 'Asian':
-                            cuisine_keywords.extend(['soy', 'ginger', 'sesame', 'rice', 'noodle', 'asian',
-                                                    'teriyaki', 'stir fry', 'wok', 'hoisin', 'oyster sauce',
-                                                    'fried rice', 'lo mein', 'chow mein', 'asian'])
-                        elif cuisine == 'Japanese':
-                            cuisine_keywords.extend(['sushi', 'sashimi', 'teriyaki', 'miso', 'soy', 'wasabi', 
-                                                    'ginger', 'seaweed', 'nori', 'rice vinegar', 'sake', 'japanese',
-                                                    'ramen', 'udon', 'tempura', 'katsu', 'edamame', 'dashi'])
-                        elif cuisine == 'Mediterranean':
-                            cuisine_keywords.extend(['olive', 'lemon', 'feta', 'hummus', 'chickpea', 'greek',
-                                                    'tahini', 'za\'atar', 'pita', 'mediterranean', 'tzatziki',
-                                                    'kebab', 'gyro', 'couscous', 'tabbouleh'])
-                        elif cuisine == 'French':
-                            cuisine_keywords.extend(['butter', 'cream', 'wine', 'herb', 'provence', 'french',
-                                                    'baguette', 'croissant', 'brie', 'camembert', 'béarnaise',
-                                                    'hollandaise', 'roux', 'quiche', 'crêpe'])
-                        elif cuisine == 'Middle Eastern':
-                            cuisine_keywords.extend(['hummus', 'tahini', 'chickpea', 'falafel', 'pita', 
-                                                    'sumac', 'za\'atar', 'shawarma', 'kebab', 'baba', 'harissa'])
-                        elif cuisine == 'American':
-                            cuisine_keywords.extend(['burger', 'barbecue', 'bbq', 'bacon', 'cheese', 'potato',
-                                                    'american', 'steak', 'rib', 'wings', 'mac'])
-                
-                # Generate recommendation with more neighbors for variety
-                try:
-                    # Request MANY more recipes when filtering by cuisine or protein (strict filtering)
-                    n_neighbors = 300 if (cuisine_keywords or included_ingredients) else (50 if budget_per_meal else 20)
-                    generator = Generator(nutrition_target, [], {'n_neighbors': n_neighbors, 'return_distance': False})
-                    recommendations = generator.generate()
-                    
-                    if recommendations and recommendations.status_code == 200:
-                        recipes = recommendations.json().get('output', [])
-                        # Filter out clearly invalid/non-meal recipes (e.g. sauces)
-                        recipes = [
-                            r for r in recipes
-                            if is_valid_recipe_name(r.get("Name", ""))
-                        ]
-                        
-                        # Add cost estimates
-                        if recipes:
-                            for recipe in recipes:
-                                recipe['estimated_cost'] = estimate_recipe_cost(recipe)
-                            
-                            # STRICT Filter by cuisine using the Cuisine column - NO FALLBACK!
-                            if cuisines and 'Any' not in cuisines:
-                                # Use the Cuisine column from enhanced dataset - STRICT MATCH ONLY
-                                cuisine_filtered = []
-                                for recipe in recipes:
-                                    recipe_cuisine = recipe.get('Cuisine', 'Other')
-                                    # Check if recipe cuisine matches any of the selected cuisines
-                                    if recipe_cuisine in cuisines:
-                                        recipe['cuisine_match_score'] = 10  # Perfect match from dataset
-                                        cuisine_filtered.append(recipe)
-                                
-                                if cuisine_filtered:
-                                    recipes = cuisine_filtered
-                                else:
-                                    # STRICT: If no matching cuisine found, skip this meal (silent in UI)
-                                    if SHOW_GENERATION_DEBUG_MESSAGES:
-                                        cuisine_names = '/'.join(cuisines)
-                                        st.error(
-                                            f"❌ No {cuisine_names} recipes found for {meal_name}. "
-                                            "Skipping this meal. Try adjusting your filters or selecting 'Any' cuisine."
-                                        )
-                                    recipes = []  # Empty list will skip this meal
-                                    continue
-                            
-                            # STRICT Filter by protein preference if specified - NO FALLBACK!
-                            if included_ingredients:
-                                protein_filtered = []
-                                for recipe in recipes:
-                                    recipe_text = f"{recipe['Name']} {' '.join(recipe.get('RecipeIngredientParts', []))}".lower()
-                                    # Check if recipe contains preferred protein
-                                    if any(ingredient.lower() in recipe_text for ingredient in included_ingredients):
-                                        protein_filtered.append(recipe)
-                                
-                                if protein_filtered:
-                                    recipes = protein_filtered
-                                else:
-                                    # STRICT: If no matching protein found, skip this meal (silent in UI)
-                                    if SHOW_GENERATION_DEBUG_MESSAGES:
-                                        protein_names = '/'.join(
-                                            [p.capitalize() for p in included_ingredients[:3]]
-                                        )
-                                        st.error(
-                                            f"❌ No {protein_names} recipes found for {meal_name}. "
-                                            "Skipping this meal. Try adjusting your protein preferences."
-                                        )
-                                    recipes = []  # Empty list will skip this meal
-                                    continue
-                            
-                            # Exclude ingredients based on dietary restrictions
-                            if excluded_ingredients:
-                                restriction_filtered = []
-                                for recipe in recipes:
-                                    recipe_text = f"{recipe['Name']} {' '.join(recipe.get('RecipeIngredientParts', []))}".lower()
-                                    # Check if recipe contains excluded ingredients
-                                    has_excluded = any(ingredient.lower() in recipe_text for ingredient in excluded_ingredients)
-                                    if not has_excluded:
-                                        restriction_filtered.append(recipe)
-                                
-                                if restriction_filtered:
-                                    recipes = restriction_filtered
-                            
-                            # Filter by budget if specified - STRICT enforcement
-                            if budget_per_meal:
-                                budget_filtered = [r for r in recipes if r['estimated_cost'] <= budget_per_meal]
-                                if budget_filtered:
-                                    recipes = budget_filtered
-                                else:
-                                    # If no recipes within budget, take cheapest ones
-                                    recipes = sorted(recipes, key=lambda x: x['estimated_cost'])[:10]
-                                    if SHOW_GENERATION_DEBUG_MESSAGES:
-                                        st.warning(
-                                            f"⚠️ Limited options within ${budget_per_meal:.2f}/meal budget for {meal_name}. "
-                                            "Showing cheapest alternatives."
-                                        )
-                            
-                            # Find first recipe that hasn't been used yet
-                            selected_recipe = None
-                            for recipe in recipes:
-                                if recipe['Name'] not in used_recipes:
-                                    selected_recipe = recipe
-                                    used_recipes.add(recipe['Name'])
-                                    break
-                            
-                            # If all recipes from this batch are used, request MORE recipes with different variation
-                            if selected_recipe is None and len(recipes) > 0:
-                                # Try generating with slightly different parameters to get new recipes
-                                cal_variation = random.uniform(0.85, 1.15)  # Wider variation
-                                varied_calories_alt = calories * cal_variation
-                                
-                                nutrition_target_alt = [
-                                    varied_calories_alt,
-                                    varied_calories_alt * random.uniform(0.02, 0.04),
-                                    varied_calories_alt * 0.007,
-                                    random.randint(30, 70),
-                                    random.randint(300, 500),
-                                    varied_calories_alt * random.uniform(0.10, 0.16),
-                                    random.randint(5, 12),
-                                    random.randint(6, 15),
-                                    varied_calories_alt * random.uniform(0.04, 0.06)
-                                ]
-                                
-                                generator_alt = Generator(nutrition_target_alt, [], {'n_neighbors': 100, 'return_distance': False})
-                                recommendations_alt = generator_alt.generate()
-                                
-                                if recommendations_alt and recommendations_alt.status_code == 200:
-                                    alt_recipes = recommendations_alt.json().get('output', [])
-                                    alt_recipes = [
-                                        r for r in alt_recipes
-                                        if is_valid_recipe_name(r.get("Name", ""))
-                                    ]
-                                    # Find unused recipe from alternative recommendations
-                                    for recipe in alt_recipes:
-                                        if recipe['Name'] not in used_recipes:
-                                            selected_recipe = recipe
-                                            used_recipes.add(recipe['Name'])
-                                            break
-                            
-                            # Final fallback: if still no unique recipe, pick one with different name pattern
-                            if selected_recipe is None and len(recipes) > 0:
-                                # Sort by how different the name is from already used recipes
-                                for recipe in recipes:
-                                    name_words = set(recipe['Name'].lower().split())
-                                    # Calculate overlap with used recipe names
-                                    min_overlap = float('inf')
-                                    for used_name in used_recipes:
-                                        used_words = set(used_name.lower().split())
-                                        overlap = len(name_words & used_words)
-                                        min_overlap = min(min_overlap, overlap)
-                                    recipe['name_uniqueness'] = min_overlap
-                                
-                                # Sort by uniqueness and pick least similar
-                                recipes_sorted = sorted(recipes, key=lambda x: x.get('name_uniqueness', 0))
-                                selected_recipe = recipes_sorted[0]
-                                if SHOW_GENERATION_DEBUG_MESSAGES:
-                                    st.info(
-                                        f"ℹ️ Using similar recipe for variety: {selected_recipe['Name']}"
-                                    )
-                            
-                            if selected_recipe:
-                                meal_plan[f'Day {day}'][meal_name] = selected_recipe
-                            else:
-                                if SHOW_GENERATION_DEBUG_MESSAGES:
-                                    st.warning(
-                                        f"⚠️ Could not find suitable recipe for {meal_name} on Day {day}"
-                                    )
-                except Exception as e:
+            # Create nutrition target with some variation
+            nutrition_targets[meal_name] = [
+                varied_calories,  # Calories
+                varied_calories * random.uniform(0.025, 0.035),  # Fat variation
+                varied_calories * 0.007,  # Saturated fat
+                random.randint(40, 60),  # Cholesterol variation
+                random.randint(350, 450),  # Sodium variation
+                varied_calories * random.uniform(0.11, 0.15),  # Carbs variation
+                random.randint(6, 10),  # Fiber variation
+                random.randint(8, 12),  # Sugar variation
+                varied_calories * random.uniform(0.045, 0.055)  # Protein variation
+            ]
+
+        # Build ingredient filter based on restrictions and cuisines
+        excluded_ingredients = []
+        included_ingredients = []
+        
+        # Dietary restrictions
+        if 'Vegetarian' in dietary_restrictions:
+            excluded_ingredients.extend(['beef', 'pork', 'chicken', 'fish', 'meat', 'turkey', 'lamb', 'seafood'])
+        if 'Vegan' in dietary_restrictions:
+            excluded_ingredients.extend(['beef', 'pork', 'chicken', 'fish', 'meat', 'turkey', 'lamb', 'seafood',
+                                        'milk', 'cheese', 'egg', 'butter', 'cream', 'yogurt', 'whey'])
+        
+        # Protein preferences
+        if 'Prefer Chicken' in dietary_restrictions:
+            included_ingredients.extend(['chicken', 'poultry'])
+        if 'Prefer Fish/Seafood' in dietary_restrictions:
+            included_ingredients.extend(['fish', 'salmon', 'tuna', 'shrimp', 'seafood', 'prawn', 'cod', 'tilapia'])
+        if 'Prefer Beef' in dietary_restrictions:
+            included_ingredients.extend(['beef', 'steak', 'ground beef'])
+        if 'Prefer Pork' in dietary_restrictions:
+            included_ingredients.extend(['pork', 'bacon', 'ham', 'sausage'])
+        
+        # Cuisines, protein preferences, dietary exclusions, the budget and
+        # the recipes already in the plan are all applied inside the engine.
+        # One call per meal returns a varied, unused recipe for every day.
+        constraints = {
+            'cuisines': cuisines if cuisines and 'Any' not in cuisines else None,
+            'include_ingredients': included_ingredients,
+            'exclude_ingredients': excluded_ingredients,
+            'max_cost': budget_per_meal,
+        }
+
+        for meal_name, nutrition_target in nutrition_targets.items():
+            try:
+                params = {'n_neighbors': num_days, 'return_distance': False, 'diversity': 0.5,
+                          **constraints, 'exclude_rows': used_recipes}
+                recipes = Generator(nutrition_target, [], params).generate().json().get('output')
+
+                if recipes is None and budget_per_meal:
+                    # Not enough left within budget: take the cheapest of
+                    # the closest matching recipes
+                    params = {**params, 'n_neighbors': num_days * 3, 'max_cost': None}
+                    recipes = Generator(nutrition_target, [], params).generate().json().get('output')
+                    recipes = sorted(recipes or [], key=lambda x: x['estimated_cost'])[:num_days]
+                    if recipes and SHOW_GENERATION_DEBUG_MESSAGES:
+                        st.warning(
+                            f"⚠️ Limited options within ${budget_per_meal:.2f}/meal budget for {meal_name}. "
+                            "Showing cheapest alternatives."
+                        )
+
+                if not recipes:
+                    # STRICT: no recipe matches the cuisine/protein/diet filters, skip this meal (silent in UI)
                     if SHOW_GENERATION_DEBUG_MESSAGES:
-                        original_error(f"Error generating {meal_name} for Day {day}: {str(e)}")
+                        st.error(
+                            f"❌ No recipes matching your preferences found for {meal_name}. "
+                            "Skipping this meal. Try adjusting your filters or selecting 'Any' cuisine."
+                        )
                     continue
 
+                used_recipes.add(store.rows_for_ids([recipe['RecipeId'] for recipe in recipes]))
+                for day, recipe in enumerate(recipes, start=1):
+                    meal_plan[f'Day {day}'][meal_name] = recipe
+            except Exception as e:
+                if SHOW_GENERATION_DEBUG_MESSAGES:
+                    original_error(f"Error generating {meal_name}: {str(e)}")
+                continue
+
     # Restore original Streamlit message functions
     st.success = original_success
     st.warning = original_warning
@@ -488,11 +326,11 @@ def display_meal_plan():
     # Display by day
     for day, meals in meal_plan.items():
         with st.expander(f"📅 {day}", expanded=True):
-            # Filter invalid/non-meal items first (prevents st.columns(0) crashes)
+            # Skip empty slots first (prevents st.columns(0) crashes)
             visible_meals = {
                 meal_name: recipe
                 for meal_name, recipe in (meals or {}).items()
-                if is_valid_recipe_name((recipe or {}).get("Name", ""))
+                if recipe
             }
 
             if not visible_meals:
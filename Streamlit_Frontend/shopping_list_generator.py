@@ -6,6 +6,8 @@ Consolidates ingredients from multiple recipes into an organized shopping list
 from collections import defaultdict
 import re
 
+from recommendation_engine import RECIPE_PRICES
+
 
 def parse_ingredient(ingredient_text):
     """
@@ -292,7 +294,8 @@ def format_shopping_list_markdown(shopping_list):
 
 def estimate_recipe_cost(recipe, price_database=None):
     """
-    Estimate cost of a single recipe.
+    Estimate cost of a single recipe. Recipes returned by the engine
+    already carry this value as ``estimated_cost``.
     
     Args:
         recipe: Recipe dictionary with 'RecipeIngredientParts' key
@@ -301,52 +304,9 @@ def estimate_recipe_cost(recipe, price_database=None):
     Returns:
         float: Estimated recipe cost
     """
-    # Simple price estimates (in USD per typical ingredient amount)
-    default_prices = {
-        'chicken': 3.5,
-        'beef': 5.5,
-        'pork': 4.0,
-        'turkey': 4.5,
-        'fish': 6.5,
-        'salmon': 8.0,
-        'shrimp': 9.0,
-        'tuna': 3.0,
-        'cheese': 4.5,
-        'milk': 2.5,
-        'cream': 3.5,
-        'butter': 3.0,
-        'egg': 2.5,
-        'rice': 2.0,
-        'pasta': 1.8,
-        'bread': 2.5,
-        'flour': 2.0,
-        'sugar': 2.5,
-        'oil': 3.5,
-        'olive oil': 6.0,
-        'tomato': 2.0,
-        'onion': 1.5,
-        'garlic': 1.0,
-        'potato': 2.0,
-        'carrot': 1.5,
-        'broccoli': 2.5,
-        'spinach': 2.5,
-        'lettuce': 2.0,
-        'pepper': 2.5,
-        'mushroom': 3.0,
-        'avocado': 2.0,
-        'lemon': 1.0,
-        'lime': 1.0,
-        'apple': 3.0,
-        'banana': 2.0,
-        'berry': 4.0,
-        'herbs': 2.5,
-        'spice': 3.0,
-        'sauce': 2.5,
-        'broth': 2.0,
-        'stock': 2.5,
-        'wine': 8.0,
-        'vinegar': 2.5
-    }
+    # Shared with the engine, which precomputes this estimate for every
+    # recipe in the dataset (the ``EstimatedCost`` column)
+    default_prices = dict(RECIPE_PRICES)
     
     if price_database:
         default_prices.update(price_database)